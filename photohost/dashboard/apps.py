@@ -4,6 +4,3 @@ from django.apps import AppConfig
 class DashboardConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "dashboard"
-
-    def ready(self):
-        import dashboard.signals
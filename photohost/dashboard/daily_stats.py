@@ -0,0 +1,189 @@
+# dashboard/daily_stats.py
+# Per-day rollup behind the stats page: finished days are counted once into
+# DailyStats, so a range query sums at most one row per day plus live counts
+# for today. Days are rolled up by the expiry sweep (before it deletes the
+# rows they were counted from), by `manage.py rollup_stats`, and on demand
+# for any day a stats request finds missing (at most ROLLUP_ON_DEMAND_DAYS
+# back, and never before the oldest stored row; longer backfills are left to
+# the command).
+#
+# Visitors are unique per day; each day also keeps a HyperLogLog sketch of
+# its visitors, so a range's unique visitors is the merge of the daily
+# sketches (~0.8% error) rather than a sum that counts a returning visitor
+# once per day.
+
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db.models import Count, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from photohostapp.models import Section, StoredFile
+from secret_notes.models import SecretNote
+from .models import DailyStats, SiteVisit, VisitorSketch
+from .visitors import HyperLogLog
+
+FIELDS = ("uploads", "bytes_uploaded", "sections", "notes", "visitors")
+ROLLUP_ON_DEMAND_DAYS = 366
+
+
+def _dt_bounds(start, end):
+    tz = timezone.get_current_timezone()
+    start_dt = timezone.make_aware(datetime.combine(start, datetime.min.time()), tz)
+    end_dt = timezone.make_aware(datetime.combine(end + timedelta(days=1), datetime.min.time()), tz)
+    return start_dt, end_dt
+
+
+def _per_day(qs, field, start, end, **aggregates):
+    start_dt, end_dt = _dt_bounds(start, end)
+    rows = (
+        qs.filter(**{f"{field}__gte": start_dt, f"{field}__lt": end_dt})
+        .annotate(day=TruncDate(field))
+        .values("day")
+        .annotate(**aggregates)
+    )
+    return {row.pop("day"): row for row in rows}
+
+
+def _visitors_per_day(start, end):
+    if getattr(settings, "VISITOR_COUNTER_MODE", "exact") == "sketch":
+        return {
+            day: HyperLogLog(registers=registers).count()
+            for day, registers in VisitorSketch.objects.filter(date__gte=start, date__lte=end).values_list("date", "registers")
+        }
+    rows = SiteVisit.objects.filter(date__gte=start, date__lte=end).values("date").annotate(n=Count("id"))
+    return {row["date"]: row["n"] for row in rows}
+
+
+def _visitor_sketches(start, end):
+    """{date: HyperLogLog} of the visitors of each day in [start, end] that had any"""
+    if getattr(settings, "VISITOR_COUNTER_MODE", "exact") == "sketch":
+        return {
+            day: HyperLogLog(registers=registers)
+            for day, registers in VisitorSketch.objects.filter(date__gte=start, date__lte=end).values_list("date", "registers")
+        }
+    sketches = {}
+    visits = SiteVisit.objects.filter(date__gte=start, date__lte=end).values_list("date", "visitor_id")
+    for day, visitor_id in visits.iterator(chunk_size=5000):
+        sketches.setdefault(day, HyperLogLog()).add(visitor_id)
+    return sketches
+
+
+def oldest_day():
+    """The first day any stored row counts towards, or None when there are none"""
+    candidates = [
+        StoredFile.objects.aggregate(d=Min("uploaded_at"))["d"],
+        Section.objects.aggregate(d=Min("created_at"))["d"],
+        SecretNote.objects.aggregate(d=Min("created_at"))["d"],
+    ]
+    days = [timezone.localdate(d) for d in candidates if d]
+    days += [d for d in (SiteVisit.objects.aggregate(d=Min("date"))["d"], VisitorSketch.objects.aggregate(d=Min("date"))["d"]) if d]
+    return min(days) if days else None
+
+
+def count_days(start, end):
+    """{date: {field: value}} for every day in [start, end], counted from the live tables"""
+    files = _per_day(StoredFile.objects.all(), "uploaded_at", start, end, n=Count("id"), size=Sum("size_bytes"))
+    sections = _per_day(Section.objects.all(), "created_at", start, end, n=Count("id"))
+    notes = _per_day(SecretNote.objects.all(), "created_at", start, end, n=Count("id"))
+    visitors = _visitors_per_day(start, end)
+
+    days = {}
+    day = start
+    while day <= end:
+        days[day] = {
+            "uploads": files.get(day, {}).get("n", 0),
+            "bytes_uploaded": files.get(day, {}).get("size") or 0,
+            "sections": sections.get(day, {}).get("n", 0),
+            "notes": notes.get(day, {}).get("n", 0),
+            "visitors": visitors.get(day, 0),
+        }
+        day += timedelta(days=1)
+    return days
+
+
+def rollup(start, end, rebuild=False):
+    """
+    Store DailyStats for the finished days in [start, end]; days already
+    rolled up are kept unless rebuild. Returns the number of days written.
+    """
+    end = min(end, timezone.localdate() - timedelta(days=1))
+    if start > end:
+        return 0
+
+    days = count_days(start, end)
+    if not rebuild:
+        for day in DailyStats.objects.filter(date__gte=start, date__lte=end).values_list("date", flat=True):
+            days.pop(day, None)
+    if not days:
+        return 0
+
+    sketches = _visitor_sketches(min(days), max(days))
+    DailyStats.objects.bulk_create(
+        [
+            DailyStats(date=day, visitor_sketch=sketches[day].to_bytes() if day in sketches else b"", **values)
+            for day, values in days.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["date"],
+        update_fields=list(FIELDS) + ["visitor_sketch"],
+        batch_size=500,
+    )
+    return len(days)
+
+
+def _fill_missing_sketches(start, end):
+    # Days rolled up before sketches were kept: add them, leave the counts alone
+    days = list(
+        DailyStats.objects.filter(date__gte=start, date__lte=end, visitors__gt=0, visitor_sketch=b"")
+        .values_list("date", flat=True)
+    )
+    if not days:
+        return
+    sketches = _visitor_sketches(min(days), max(days))
+    for day in days:
+        if day in sketches:
+            DailyStats.objects.filter(date=day).update(visitor_sketch=sketches[day].to_bytes())
+
+
+def _ensure_rolled_up(start, end):
+    # Days before the oldest row have nothing to count: leave them without rows
+    end = min(end, timezone.localdate() - timedelta(days=1))
+    first = oldest_day()
+    if first is None:
+        return
+    start = max(start, first, end - timedelta(days=ROLLUP_ON_DEMAND_DAYS - 1))
+    if start > end:
+        return
+    if DailyStats.objects.filter(date__gte=start, date__lte=end).count() < (end - start).days + 1:
+        rollup(start, end)
+    _fill_missing_sketches(start, end)
+
+
+def range_totals(start, end):
+    """
+    Totals of FIELDS over the days [start, end]: rollup rows plus today's
+    live counts. visitors is the unique visitors of the whole range: exact
+    for a single day, merged from the daily sketches otherwise.
+    """
+    _ensure_rolled_up(start, end)
+
+    rows = DailyStats.objects.filter(date__gte=start, date__lte=end)
+    totals = rows.aggregate(**{field: Sum(field) for field in FIELDS})
+    totals = {field: value or 0 for field, value in totals.items()}
+
+    today = timezone.localdate()
+    live = start <= today <= end
+    if live:
+        for field, value in count_days(today, today)[today].items():
+            totals[field] += value
+
+    if start != end:
+        merged = HyperLogLog()
+        for registers in rows.exclude(visitor_sketch=b"").values_list("visitor_sketch", flat=True).iterator():
+            merged.merge(HyperLogLog(registers=registers))
+        if live:
+            for sketch in _visitor_sketches(today, today).values():
+                merged.merge(sketch)
+        totals["visitors"] = merged.count()
+    return totals
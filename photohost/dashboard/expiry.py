@@ -0,0 +1,66 @@
+# dashboard/expiry.py
+# Out-of-band expiry sweep for everything that has an expiry date.
+# Runs from `manage.py sweep_expired`, never from a request.
+
+import logging
+import time
+from django.conf import settings
+from django.utils import timezone
+
+from photohostapp.expiry import delete_expired_sections, delete_stale_uploads, sweep_expired, SWEEP_BATCH_SIZE
+from secret_notes.models import SecretNote
+from .daily_stats import rollup
+from .models import ReadOnceNoteRetention
+
+logger = logging.getLogger(__name__)
+
+# Days before today the sweep makes sure are rolled up (missing ones only)
+ROLLUP_LOOKBACK_DAYS = 7
+
+
+def run_expiry_sweep(batch_size=None, max_batches=None):
+    """
+    Sweep expired sections, secret notes, retention copies and abandoned
+    chunked uploads once.
+
+    Returns per-run metrics:
+      {"sections": n, "notes": n, "retention": n, "uploads": n, "bytes_freed": n, "duration": seconds}
+    """
+    batch_size = batch_size or getattr(settings, "EXPIRY_SWEEP_BATCH_SIZE", SWEEP_BATCH_SIZE)
+    started = time.monotonic()
+    now = timezone.now()
+
+    # Count the finished days before their rows are deleted
+    yesterday = timezone.localdate(now) - timezone.timedelta(days=1)
+    rollup(yesterday - timezone.timedelta(days=ROLLUP_LOOKBACK_DAYS - 1), yesterday)
+
+    sections = delete_expired_sections(now=now, batch_size=batch_size, max_batches=max_batches)
+
+    notes = sweep_expired(
+        SecretNote.objects.filter(expires_at__lte=now).order_by("expires_at"),
+        batch_size=batch_size,
+        max_batches=max_batches,
+    )
+
+    retention = sweep_expired(
+        ReadOnceNoteRetention.objects.filter(expires_at__lte=now).order_by("expires_at"),
+        batch_size=batch_size,
+        max_batches=max_batches,
+    )
+
+    uploads = delete_stale_uploads(now=now, batch_size=batch_size, max_batches=max_batches)
+
+    metrics = {
+        "sections": sections["rows"],
+        "notes": notes,
+        "retention": retention,
+        "uploads": uploads,
+        "bytes_freed": sections["bytes"],
+        "duration": round(time.monotonic() - started, 3),
+    }
+    logger.info(
+        "Expiry sweep: %(sections)s sections, %(notes)s notes, %(retention)s retention copies, "
+        "%(uploads)s stale uploads, %(bytes_freed)s bytes freed in %(duration)ss",
+        metrics,
+    )
+    return metrics
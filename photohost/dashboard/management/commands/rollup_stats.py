@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from dashboard.daily_stats import oldest_day, rollup
+
+
+class Command(BaseCommand):
+    help = "Roll finished days up into DailyStats (by default every day since the oldest stored row)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", help="First day to roll up, YYYY-MM-DD.")
+        parser.add_argument("--until", help="Last day to roll up, YYYY-MM-DD (default: yesterday).")
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Recount days that are already rolled up instead of only filling gaps.",
+        )
+
+    def _date(self, value):
+        try:
+            return datetime.strptime(value, "%Y-%m-%d").date()
+        except ValueError:
+            raise CommandError(f"Invalid date {value!r}. Use YYYY-MM-DD")
+
+    def handle(self, *args, **options):
+        until = self._date(options["until"]) if options["until"] else timezone.localdate() - timedelta(days=1)
+        since = self._date(options["since"]) if options["since"] else oldest_day()
+        if since is None:
+            self.stdout.write("Nothing to roll up.")
+            return
+
+        written = rollup(since, until, rebuild=options["rebuild"])
+        self.stdout.write(f"days={written} range={since}..{until}")
@@ -0,0 +1,52 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from dashboard.expiry import run_expiry_sweep
+
+
+class Command(BaseCommand):
+    help = "Delete expired sections (with their media), secret notes, retention copies and stale chunked uploads."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and sweep every --interval seconds.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=getattr(settings, "EXPIRY_SWEEP_INTERVAL", 300),
+            help="Seconds between sweeps in --loop mode.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=getattr(settings, "EXPIRY_SWEEP_BATCH_SIZE", 500),
+            help="Rows deleted per transaction.",
+        )
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            default=None,
+            help="Stop each sweep after this many batches per model.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            m = run_expiry_sweep(batch_size=options["batch_size"], max_batches=options["max_batches"])
+            self.stdout.write(
+                f"sections={m['sections']} notes={m['notes']} retention={m['retention']} uploads={m['uploads']} "
+                f"bytes_freed={m['bytes_freed']} duration={m['duration']}s"
+            )
+
+            if not options["loop"]:
+                break
+
+            try:
+                time.sleep(options["interval"])
+            except KeyboardInterrupt:
+                break
@@ -1,11 +1,12 @@
 import hashlib
 from django.utils import timezone
-from .models import SiteVisit
+from .visitors import visitor_buffer
 
 class SimpleVisitorCounterMiddleware:
     """
     Very simple unique visitor counter per day.
     Uses a hash of IP + User-Agent. (Good enough for your requirement.)
+    Visits are buffered in memory and flushed in bulk, see dashboard.visitors.
     """
     def __init__(self, get_response):
         self.get_response = get_response
@@ -21,9 +22,8 @@ class SimpleVisitorCounterMiddleware:
         raw = f"{ip}|{ua}".encode("utf-8", errors="ignore")
         visitor_id = hashlib.sha256(raw).hexdigest()[:64]
 
-        today = timezone.localdate()
         try:
-            SiteVisit.objects.get_or_create(date=today, visitor_id=visitor_id)
+            visitor_buffer.add(timezone.localdate(), visitor_id)
         except Exception:
             # Don't ever break requests because of counter
             pass
@@ -13,6 +13,33 @@ class SiteVisit(models.Model):
         return f"{self.date} {self.visitor_id}"
 
 
+class VisitorSketch(models.Model):
+    """HyperLogLog registers for one day (VISITOR_COUNTER_MODE = "sketch")."""
+    date = models.DateField(unique=True)
+    registers = models.BinaryField(default=bytes)
+
+    def __str__(self):
+        return f"VisitorSketch {self.date}"
+
+
+class DailyStats(models.Model):
+    """
+    Totals of one finished day for the stats page (see daily_stats.py).
+    Counted from the rows that existed when the day was rolled up.
+    """
+    date = models.DateField(unique=True)
+    uploads = models.PositiveIntegerField(default=0)
+    bytes_uploaded = models.PositiveBigIntegerField(default=0)
+    sections = models.PositiveIntegerField(default=0)
+    notes = models.PositiveIntegerField(default=0)
+    visitors = models.PositiveIntegerField(default=0)  # unique that day
+    # HyperLogLog registers of that day's visitors, merged for ranges
+    visitor_sketch = models.BinaryField(default=bytes)
+
+    def __str__(self):
+        return f"DailyStats {self.date}"
+
+
 class ReadOnceNoteRetention(models.Model):
 
     id = models.BigAutoField(primary_key=True)
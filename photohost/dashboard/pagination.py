@@ -0,0 +1,89 @@
+"""
+Keyset (cursor) pagination for the dashboard lists.
+
+Pages are addressed by the sort key of the row next to them instead of an
+offset: ?after=<cursor> is the page following that row, ?before=<cursor>
+the page preceding it and ?last=1 the oldest page. Every page is one
+indexed range scan of per_page + 1 rows, so the last page costs the same
+as the first. Lists are sorted newest first on (field, pk); the model
+needs an index on both.
+
+List totals are counted only up to COUNT_LIMIT ("1000+"), so showing them
+doesn't bring back a scan of every match.
+"""
+from datetime import datetime
+from django.db.models import Q
+import base64
+import json
+
+COUNT_LIMIT = 1000
+
+
+def encode_cursor(value, pk):
+    raw = json.dumps([value.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(datetime, pk) or None if the cursor is missing or malformed"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, pk = json.loads(raw)
+        return datetime.fromisoformat(value), int(pk)
+    except (ValueError, TypeError):
+        return None
+
+
+class KeysetPage:
+    def __init__(self, object_list, field, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.has_other_pages = has_next or has_previous
+        self.next_cursor = self.previous_cursor = None
+        if object_list:
+            first, last = object_list[0], object_list[-1]
+            self.previous_cursor = encode_cursor(getattr(first, field), first.pk)
+            self.next_cursor = encode_cursor(getattr(last, field), last.pk)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def keyset_page(qs, field, params, per_page=20):
+    """
+    The page of qs (newest first on field, then pk) that the request's
+    after / before / last parameters point at; the first page without them.
+    """
+    after = decode_cursor(params.get("after"))
+    before = decode_cursor(params.get("before"))
+    descending = (f"-{field}", "-pk")
+    ascending = (field, "pk")
+
+    if after:
+        value, pk = after
+        qs = qs.filter(Q(**{f"{field}__lt": value}) | Q(**{field: value, "pk__lt": pk}))
+        rows = list(qs.order_by(*descending)[:per_page + 1])
+        return KeysetPage(rows[:per_page], field, has_next=len(rows) > per_page, has_previous=True)
+
+    if before or params.get("last"):
+        if before:
+            value, pk = before
+            qs = qs.filter(Q(**{f"{field}__gt": value}) | Q(**{field: value, "pk__gt": pk}))
+        rows = list(qs.order_by(*ascending)[:per_page + 1])
+        page = rows[:per_page][::-1]
+        return KeysetPage(page, field, has_next=bool(before), has_previous=len(rows) > per_page)
+
+    rows = list(qs.order_by(*descending)[:per_page + 1])
+    return KeysetPage(rows[:per_page], field, has_next=len(rows) > per_page, has_previous=False)
+
+
+def capped_count(qs, limit=COUNT_LIMIT):
+    """(count, more): the rows of qs counted up to limit, and whether there are more"""
+    n = qs.order_by()[:limit + 1].count()
+    return min(n, limit), n > limit
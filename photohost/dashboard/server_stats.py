@@ -0,0 +1,204 @@
+# dashboard/server_stats.py
+# Server metrics for the stats page, sampled by a background thread into a
+# ring buffer: requests only read the latest sample (and the history for the
+# sparklines), nothing blocks on CPU measurement.
+
+import logging
+import os
+import platform
+import shutil
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from photohostapp.usage import media_bytes
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+# Series kept in the history (sparklines), in sample order
+SERIES = ("cpu_percent", "ram_used_pct", "disk_used_pct", "load_1", "media_bytes")
+
+
+class ServerStatsSampler:
+    """
+    Samples CPU, RAM, disk, load average and the upload storage counter
+    (photohostapp.usage) every `interval` seconds into a deque of `history`
+    samples. The thread starts with the first read.
+
+    CPU is psutil.cpu_percent(interval=None): utilisation since the previous
+    sample, so measuring never sleeps.
+    """
+    def __init__(self, interval=10, history=60):
+        self.interval = interval
+        self.samples = deque(maxlen=history)
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._static = None
+        self._cpu_primed_at = None
+
+    def _static_info(self):
+        if self._static is None:
+            info = {
+                "os": f"{platform.system()} {platform.release()}",
+                "python": platform.python_version(),
+                "cpu_count": None,
+                "boot_time": None,
+            }
+            if psutil is not None:
+                info["cpu_count"] = psutil.cpu_count(logical=True) or 0
+                info["boot_time"] = psutil.boot_time()
+                psutil.cpu_percent(interval=None)  # prime the CPU counter
+                self._cpu_primed_at = time.monotonic()
+            self._static = info
+        return self._static
+
+    def sample(self):
+        """Take one sample now and append it to the history"""
+        disk_path = getattr(settings, "BASE_DIR", ".")
+        du = shutil.disk_usage(disk_path)
+        sample = {
+            "time": time.time(),
+            "disk_path": str(disk_path),
+            "disk_total": du.total,
+            "disk_used": du.used,
+            "disk_free": du.free,
+            "disk_used_pct": round((du.used / du.total) * 100, 1) if du.total else 0.0,
+            "cpu_percent": None,
+            "ram_total": None,
+            "ram_used": None,
+            "ram_available": None,
+            "ram_used_pct": None,
+            "load_1": None,
+            "loadavg": None,
+            "media_bytes": None,
+        }
+
+        if psutil is not None:
+            try:
+                cpu = psutil.cpu_percent(interval=None)
+                # Right after priming there is no interval to measure over yet
+                if self._cpu_primed_at is None or time.monotonic() - self._cpu_primed_at >= 0.1:
+                    sample["cpu_percent"] = round(cpu, 1)
+                vm = psutil.virtual_memory()
+                sample.update({
+                    "ram_total": vm.total,
+                    "ram_used": vm.used,
+                    "ram_available": vm.available,
+                    "ram_used_pct": round(vm.percent, 1),
+                })
+            except Exception:
+                logger.debug("psutil sample failed", exc_info=True)
+
+        try:
+            sample["media_bytes"] = media_bytes()
+        except Exception:
+            logger.debug("Media usage unavailable", exc_info=True)
+
+        try:
+            la = os.getloadavg()
+            sample["load_1"] = round(la[0], 2)
+            sample["loadavg"] = f"{la[0]:.2f}, {la[1]:.2f}, {la[2]:.2f}"
+        except (AttributeError, OSError):
+            pass
+
+        with self._lock:
+            self.samples.append(sample)
+        return sample
+
+    def _ensure_sampler(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="server-stats-sampler", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.sample()
+            except Exception:
+                logger.exception("Server stats sample failed")
+            finally:
+                close_old_connections()
+            time.sleep(self.interval)
+
+    def snapshot(self):
+        """The latest sample plus static info, formatted for the template"""
+        info = self._static_info()
+        self._ensure_sampler()
+        with self._lock:
+            latest = self.samples[-1] if self.samples else None
+        if latest is None:
+            # First read in this process
+            latest = self.sample()
+
+        uptime = None
+        if info["boot_time"]:
+            uptime = str(timedelta(seconds=int(time.time() - info["boot_time"])))
+
+        return {
+            "os": info["os"],
+            "python": info["python"],
+            "cpu_count": info["cpu_count"],
+            "uptime": uptime,
+            "disk_path": latest["disk_path"],
+            "disk_total": fmt_bytes(latest["disk_total"]),
+            "disk_used": fmt_bytes(latest["disk_used"]),
+            "disk_free": fmt_bytes(latest["disk_free"]),
+            "disk_used_pct": latest["disk_used_pct"],
+            "cpu_percent": latest["cpu_percent"],
+            "ram_total": fmt_bytes(latest["ram_total"]) if latest["ram_total"] is not None else None,
+            "ram_used": fmt_bytes(latest["ram_used"]) if latest["ram_used"] is not None else None,
+            "ram_available": fmt_bytes(latest["ram_available"]) if latest["ram_available"] is not None else None,
+            "ram_used_pct": latest["ram_used_pct"],
+            "loadavg": latest["loadavg"],
+            "media_size": fmt_bytes(latest["media_bytes"]) if latest["media_bytes"] is not None else None,
+        }
+
+    def history(self):
+        """{series: [values, oldest first]} over the buffered samples (None where unknown)"""
+        with self._lock:
+            samples = list(self.samples)
+        return {name: [s[name] for s in samples] for name in SERIES}
+
+
+def fmt_bytes(num: int) -> str:
+    # 1024-based (KiB, MiB...) but with friendly labels
+    step = 1024.0
+    for unit in ["B", "KB", "MB", "GB", "TB", "PB"]:
+        if num < step:
+            return f"{num:.0f} {unit}" if unit == "B" else f"{num:.2f} {unit}"
+        num /= step
+    return f"{num:.2f} EB"
+
+
+def sparkline_points(values, width=120, height=28):
+    """SVG polyline points for values (None skipped), scaled to width x height; "" if < 2 points"""
+    points = [(i, v) for i, v in enumerate(values) if v is not None]
+    if len(points) < 2:
+        return ""
+    low = min(v for _, v in points)
+    high = max(v for _, v in points)
+    last = max(len(values) - 1, 1)
+
+    def y(v):
+        # A flat series is drawn across the middle
+        return height / 2 if high == low else height - (v - low) * height / (high - low)
+
+    return " ".join(f"{i * width / last:.1f},{y(v):.1f}" for i, v in points)
+
+
+server_stats = ServerStatsSampler(
+    interval=getattr(settings, "SERVER_STATS_INTERVAL", 10),
+    history=getattr(settings, "SERVER_STATS_HISTORY", 60),
+)
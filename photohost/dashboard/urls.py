@@ -20,6 +20,7 @@ urlpatterns = [
     path("files/", views.files_page, name="files"),
     path("secret-notes/", views.secret_notes_page, name="secret_notes"),  # ✅ add
     path("api/secret-notes/", views.api_secret_notes, name="api_secret_notes"),
+    path("api/search/", views.api_search, name="api_search"),
     # partials (AJAX loaded into shell)
     path("partials/stats/", views.stats_partial, name="stats_partial"),
     path("partials/sections/", views.sections_partial, name="sections_partial"),
@@ -5,9 +5,15 @@ from django.shortcuts import render, redirect
 from django.utils import timezone
 from django.http import HttpResponseBadRequest
 from django.db.models import Q
+from django.db.models.functions import Lower
 from photohostapp.models import Section, StoredFile
+from photohostapp.search import file_filter, search_files, search_sections, section_filter
+from photohostapp.serving import serve_stored_file
 from secret_notes.models import SecretNote
 from .models import SiteVisit,  ReadOnceNoteRetention, FlaggedSecretNote, DashboardProfile
+from .daily_stats import range_totals
+from .server_stats import fmt_bytes, server_stats as sampler, sparkline_points
+from .pagination import capped_count, keyset_page
 from django.http import JsonResponse
 from .auth_utils import dashboard_2fa_required, staff_required
 # Import here to avoid circular import problems
@@ -17,17 +23,13 @@ import base64
 import io
 import pyotp
 import qrcode
-import os
-import platform
-import shutil
 from django.conf import settings
-import mimetypes
 from django.http import Http404, FileResponse
 from django.shortcuts import get_object_or_404
 from django.views.decorators.http import require_GET
 from django.core.paginator import Paginator
 from django.views.decorators.http import require_POST
-from django.db import transaction
+from django.db import connection, transaction
 def _parse_range(request):
     """
     Accepts:
@@ -62,84 +64,23 @@ def _dt_bounds(start_date, end_date):
     end_dt = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), datetime.min.time()), tz)
     return start_dt, end_dt
 
-def _fmt_bytes(num: int) -> str:
-    # 1024-based (KiB, MiB...) but with friendly labels
-    step = 1024.0
-    for unit in ["B", "KB", "MB", "GB", "TB", "PB"]:
-        if num < step:
-            return f"{num:.0f} {unit}" if unit == "B" else f"{num:.2f} {unit}"
-        num /= step
-    return f"{num:.2f} EB"
-
-def _get_server_stats():
-    # Disk stats: use MEDIA_ROOT if set, else project base dir
-    disk_path = getattr(settings, "BASE_DIR", ".")
-    du = shutil.disk_usage(disk_path)
-
-    disk_total = du.total
-    disk_used = du.used
-    disk_free = du.free
-    disk_used_pct = round((disk_used / disk_total) * 100, 1) if disk_total else 0.0
-
-    stats = {
-        "os": f"{platform.system()} {platform.release()}",
-        "python": platform.python_version(),
-        "disk_path": str(disk_path),
-        "disk_total": _fmt_bytes(disk_total),
-        "disk_used": _fmt_bytes(disk_used),
-        "disk_free": _fmt_bytes(disk_free),
-        "disk_used_pct": disk_used_pct,
-    }
-
-    # Optional: psutil gives CPU/RAM/uptime (works on Windows + Linux)
-    try:
-        import psutil
-
-        # CPU
-        cpu_percent = psutil.cpu_percent(interval=0.2)
-        cpu_count = psutil.cpu_count(logical=True) or 0
-
-        # RAM
-        vm = psutil.virtual_memory()
-        ram_total = vm.total
-        ram_used = vm.used
-        ram_available = vm.available
-        ram_used_pct = round(vm.percent, 1)
-
-        # Uptime
-        boot = timezone.datetime.fromtimestamp(psutil.boot_time(), tz=timezone.get_current_timezone())
-        uptime_td = timezone.now() - boot
-
-        stats.update({
-            "cpu_percent": round(cpu_percent, 1),
-            "cpu_count": cpu_count,
-            "ram_total": _fmt_bytes(ram_total),
-            "ram_used": _fmt_bytes(ram_used),
-            "ram_available": _fmt_bytes(ram_available),
-            "ram_used_pct": ram_used_pct,
-            "uptime": str(timedelta(seconds=int(uptime_td.total_seconds()))),
-        })
+SEARCH_PAGE_SIZE = 20
+# Ranking scores every match, so deep pages cost as much as the whole result
+# set: only the best SEARCH_MAX_PAGES pages of each list are served.
+SEARCH_MAX_PAGES = 10
 
-    except Exception:
-        # If psutil isn't installed or fails, we still have disk + OS/Python
-        stats.update({
-            "cpu_percent": None,
-            "cpu_count": None,
-            "ram_total": None,
-            "ram_used": None,
-            "ram_available": None,
-            "ram_used_pct": None,
-            "uptime": None,
-        })
 
-    # Load average (Linux/macOS only)
-    try:
-        la = os.getloadavg()  # (1, 5, 15)
-        stats["loadavg"] = f"{la[0]:.2f}, {la[1]:.2f}, {la[2]:.2f}"
-    except Exception:
-        stats["loadavg"] = None
+def _prefix_range(prefix: str):
+    # [prefix, next) in code point order: everything starting with prefix, as an index range
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _db_lower(s: str):
+    # Lowercase s the way the database's LOWER() does; SQLite only folds ASCII
+    if connection.vendor == "sqlite":
+        return "".join(ch.lower() if ch.isascii() else ch for ch in s)
+    return s.lower()
 
-    return stats
 
 def _parse_ddmmyyyy(s: str):
     s = (s or "").strip()
@@ -318,24 +259,23 @@ def stats_partial(request):
     except ValueError as e:
         return HttpResponseBadRequest(str(e))
 
-    start_dt, end_dt = _dt_bounds(start, end)
-
-    files_count = StoredFile.objects.filter(uploaded_at__gte=start_dt, uploaded_at__lt=end_dt).count()
-    sections_count = Section.objects.filter(created_at__gte=start_dt, created_at__lt=end_dt).count()
-    notes_count = SecretNote.objects.filter(created_at__gte=start_dt, created_at__lt=end_dt).count()
+    # Unique visitors over the whole range (daily sketches merged), see daily_stats.py
+    totals = range_totals(start, end)
 
-    visitors_count = SiteVisit.objects.filter(date__gte=start, date__lte=end).values("visitor_id").distinct().count()
-
-    server_stats = _get_server_stats()
+    server_stats = sampler.snapshot()
+    history = sampler.history()
+    sparklines = {name: sparkline_points(values) for name, values in history.items()}
 
     return render(request, "dashboard/partials/stats.html", {
         "start": start,
         "end": end,
-        "files_count": files_count,
-        "sections_count": sections_count,
-        "notes_count": notes_count,
-        "visitors_count": visitors_count,
+        "files_count": totals["uploads"],
+        "bytes_uploaded": fmt_bytes(totals["bytes_uploaded"]),
+        "sections_count": totals["sections"],
+        "notes_count": totals["notes"],
+        "visitors_count": totals["visitors"],
         "server_stats": server_stats,
+        "sparklines": sparklines,
     })
 
 
@@ -354,13 +294,13 @@ def preview_file(request, slug, file_id):
     if section.is_expired():
         raise Http404("Section expired")
 
-    content_type, _ = mimetypes.guess_type(stored_file.original_name or stored_file.file.name)
-    if not content_type or not content_type.startswith("image/"):
+    if stored_file.kind != StoredFile.Kind.IMAGE:
         raise Http404("Not an image")
 
-    resp = FileResponse(stored_file.file.open("rb"), content_type=content_type)
-    resp["Content-Disposition"] = f'inline; filename="{stored_file.original_name}"'
-    return resp
+    try:
+        return serve_stored_file(request, stored_file, public=False)
+    except FileNotFoundError:
+        raise Http404("File missing")
 
 def download_file(request, slug, file_id):
     stored_file = get_object_or_404(StoredFile, id=file_id, section__slug=slug)
@@ -369,93 +309,87 @@ def download_file(request, slug, file_id):
     if section.is_expired():
         raise Http404("Section expired")
 
-    return FileResponse(
-        stored_file.file.open("rb"),
-        as_attachment=True,
-        filename=stored_file.original_name,
-    )
+    try:
+        return serve_stored_file(request, stored_file, as_attachment=True)
+    except FileNotFoundError:
+        raise Http404("File missing")
 
 @dashboard_2fa_required
 def files_partial(request):
     q = (request.GET.get("q") or "").strip()
 
-    qs = StoredFile.objects.select_related("section").order_by("-uploaded_at")
+    qs = StoredFile.objects.select_related("section").filter(section__expires_at__gt=timezone.now())
 
     q_date = _parse_ddmmyyyy(q)
 
     if q:
         if q_date:
-            # ✅ date search (Django handles TZ correctly)
-            qs = qs.filter(uploaded_at__date=q_date)
+            # Range instead of __date so the (uploaded_at, id) index applies
+            day_start, day_end = _dt_bounds(q_date, q_date)
+            qs = qs.filter(uploaded_at__gte=day_start, uploaded_at__lt=day_end)
         else:
-            # ✅ text search
-            qs = qs.filter(
-                Q(original_name__icontains=q) |
-                Q(section__slug__icontains=q) |
-                Q(file__icontains=q)
-            )
-
-    # Exclude expired sections (python-side)
-    valid_files = [f for f in qs if not f.section.is_expired()]
-
-    paginator = Paginator(valid_files, 20)
-    page_number = request.GET.get("page") or 1
-    page_obj = paginator.get_page(page_number)
-
+            # Substring search through the search index (photohostapp/search.py). Terms
+            # too short for it fall back to case-insensitive prefixes, each answered
+            # from an index: LOWER(original_name) and LOWER(slug).
+            match = file_filter(q)
+            if match is None:
+                prefix_from, prefix_to = _prefix_range(_db_lower(q))
+                qs = qs.annotate(name_lower=Lower("original_name"))
+                sections = Section.objects.annotate(slug_lower=Lower("slug")).filter(
+                    slug_lower__gte=prefix_from, slug_lower__lt=prefix_to
+                )
+                match = (
+                    Q(name_lower__gte=prefix_from, name_lower__lt=prefix_to) |
+                    Q(section_id__in=sections.values("id"))
+                )
+            qs = qs.filter(match)
+
+    page_obj = keyset_page(qs, "uploaded_at", request.GET)
+
+    total, total_more = capped_count(qs)
     return render(request, "dashboard/partials/files.html", {
         "q": q,
         "page_obj": page_obj,
         "files": page_obj.object_list,
+        "total": total,
+        "total_more": total_more,
     })
 
 
 @dashboard_2fa_required
 def sections_partial(request):
     q = (request.GET.get("q") or "").strip()
-    q_low = q.lower()
-
-    qs = Section.objects.all().order_by("-created_at")
 
-    # Exclude expired (python-side)
-    sections = [s for s in qs if not s.is_expired()]
+    qs = Section.objects.filter(expires_at__gt=timezone.now())
 
     if q:
+        match = section_filter(q)
+        if match is None:
+            # Too short for the search index: case-insensitive slug or title
+            # prefix, each answered from its index (LOWER(slug), LOWER(title))
+            prefix_from, prefix_to = _prefix_range(_db_lower(q))
+            qs = qs.annotate(slug_lower=Lower("slug"), title_lower=Lower("title"))
+            match = (
+                Q(slug_lower__gte=prefix_from, slug_lower__lt=prefix_to) |
+                Q(title_lower__gte=prefix_from, title_lower__lt=prefix_to)
+            )
         q_date = _parse_ddmmyyyy(q)
+        if q_date:
+            # Ranges instead of __date so the created_at / expires_at indexes apply
+            day_start, day_end = _dt_bounds(q_date, q_date)
+            match |= Q(created_at__gte=day_start, created_at__lt=day_end)
+            match |= Q(expires_at__gte=day_start, expires_at__lt=day_end)
+        qs = qs.filter(match)
 
-        def match_section(s):
-            # text match (slug/title)
-            if q_low in (s.slug or "").lower() or q_low in (s.title or "").lower():
-                return True
-
-            # date match
-            if q_date:
-                # created_at date match
-                if s.created_at and s.created_at.date() == q_date:
-                    return True
-                # expires_at property match
-                exp = s.expires_at
-                if exp and exp.date() == q_date:
-                    return True
-                return False
-
-            # if query looks like dd.mm.yyyy string, match formatted dates too
-            if len(q) == 10 and q[2] == "." and q[5] == ".":
-                created_str = s.created_at.strftime("%d.%m.%Y") if s.created_at else ""
-                expires_str = s.expires_at.strftime("%d.%m.%Y") if s.expires_at else ""
-                return q == created_str or q == expires_str
-
-            return False
-
-        sections = [s for s in sections if match_section(s)]
-
-    paginator = Paginator(sections, 20)
-    page_number = request.GET.get("page") or 1
-    page_obj = paginator.get_page(page_number)
+    page_obj = keyset_page(qs, "created_at", request.GET)
 
+    total, total_more = capped_count(qs)
     return render(request, "dashboard/partials/sections.html", {
         "q": q,
         "page_obj": page_obj,
         "sections": page_obj.object_list,
+        "total": total,
+        "total_more": total_more,
     })
 
 
@@ -625,6 +559,61 @@ def api_secret_notes(request):
 
     return JsonResponse({"notes": notes, "retention": retention})
 
+@require_GET
+@dashboard_2fa_required
+def api_search(request):
+    """
+    Ranked file and section hits for ?q=. The two lists are paged on their
+    own (?files_page=, ?sections_page=, SEARCH_PAGE_SIZE each, at most
+    SEARCH_MAX_PAGES); ?type=files or ?type=sections returns just one.
+    """
+    q = (request.GET.get("q") or "").strip()
+    kind = request.GET.get("type") or ""
+    if kind not in ("", "files", "sections"):
+        return JsonResponse({"status": "error", "message": "Invalid type"}, status=400)
+
+    pages = {}
+    for name in ("files", "sections"):
+        try:
+            pages[name] = int(request.GET.get(f"{name}_page") or 1)
+        except ValueError:
+            pages[name] = 0
+        if not 1 <= pages[name] <= SEARCH_MAX_PAGES:
+            return JsonResponse({"status": "error", "message": f"Invalid {name}_page"}, status=400)
+
+    data = {"q": q}
+
+    if kind in ("", "files"):
+        files, more = search_files(q, limit=SEARCH_PAGE_SIZE, offset=(pages["files"] - 1) * SEARCH_PAGE_SIZE)
+        data.update({
+            "files_page": pages["files"],
+            "files_has_more": more and pages["files"] < SEARCH_MAX_PAGES,
+            "files": [{
+                "id": f.id,
+                "name": f.original_name,
+                "section": f.section.slug,
+                "kind": f.kind,
+                "size": f.size_bytes,
+                "uploaded_at": f.uploaded_at.isoformat(),
+            } for f in files],
+        })
+
+    if kind in ("", "sections"):
+        sections, more = search_sections(q, limit=SEARCH_PAGE_SIZE, offset=(pages["sections"] - 1) * SEARCH_PAGE_SIZE)
+        data.update({
+            "sections_page": pages["sections"],
+            "sections_has_more": more and pages["sections"] < SEARCH_MAX_PAGES,
+            "sections": [{
+                "id": s.id,
+                "slug": s.slug,
+                "title": s.title,
+                "created_at": s.created_at.isoformat(),
+                "expires_at": s.expires_at.isoformat(),
+            } for s in sections],
+        })
+
+    return JsonResponse(data)
+
 @require_POST
 @dashboard_2fa_required
 def dashboard_delete_file(request, file_id):
@@ -161,3 +161,64 @@ MESSAGE_TAGS = {
 }
 
 DATA_UPLOAD_MAX_NUMBER_FILES = 2000
+
+# Uploads are streamed to disk next to MEDIA_ROOT so storage can rename them into place
+UPLOAD_TEMP_DIR = os.path.join(MEDIA_ROOT, 'uploads_tmp')
+
+# Threads used to strip image metadata from one upload batch (1 = serial)
+EXIF_STRIP_WORKERS = int(os.getenv("EXIF_STRIP_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Expiry worker (`manage.py sweep_expired --loop`)
+EXPIRY_SWEEP_INTERVAL = int(os.getenv("EXPIRY_SWEEP_INTERVAL", "300"))
+EXPIRY_SWEEP_BATCH_SIZE = int(os.getenv("EXPIRY_SWEEP_BATCH_SIZE", "500"))
+
+# Resumable uploads: partial files live in CHUNKED_UPLOAD_TEMP_DIR (default UPLOAD_TEMP_DIR)
+# and are swept once older than CHUNKED_UPLOAD_TTL_HOURS
+CHUNKED_UPLOAD_TEMP_DIR = os.getenv("CHUNKED_UPLOAD_TEMP_DIR") or None
+CHUNKED_UPLOAD_TTL_HOURS = int(os.getenv("CHUNKED_UPLOAD_TTL_HOURS", "24"))
+
+# Visitor counter: "exact" (SiteVisit rows) or "sketch" (HyperLogLog per day)
+VISITOR_COUNTER_MODE = os.getenv("VISITOR_COUNTER_MODE", "exact")
+VISITOR_FLUSH_INTERVAL = int(os.getenv("VISITOR_FLUSH_INTERVAL", "30"))
+VISITOR_DEDUP_MAX = 100_000
+
+# Who streams file bodies once a view has checked access: "django" (FileResponse),
+# "nginx" (X-Accel-Redirect to FILE_SERVING_INTERNAL_URL, an `internal` location
+# aliased to MEDIA_ROOT) or "sendfile" (X-Sendfile, Apache/lighttpd)
+FILE_SERVING_BACKEND = os.getenv("FILE_SERVING_BACKEND", "django")
+FILE_SERVING_INTERNAL_URL = os.getenv("FILE_SERVING_INTERNAL_URL", "/protected/")
+
+# Rendered section pages are cached here. With several workers, point it at a shared
+# backend (e.g. django.core.cache.backends.redis.RedisCache) so deletes invalidate everywhere.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
+SECTION_CACHE_TIMEOUT = int(os.getenv("SECTION_CACHE_TIMEOUT", "3600"))
+
+# Text files: this many bytes are stored as the inline preview, the rest loads on demand
+TEXT_PREVIEW_MAX_BYTES = int(os.getenv("TEXT_PREVIEW_MAX_BYTES", "4096"))
+
+# Coordinate OCR (`manage.py ocr_worker`). TESSERACT_CMD is only needed when
+# tesseract is not on PATH, e.g. r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+TESSERACT_CMD = os.getenv("TESSERACT_CMD") or None
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "2"))
+OCR_JOB_TIMEOUT = int(os.getenv("OCR_JOB_TIMEOUT", "30"))
+OCR_MAX_ATTEMPTS = int(os.getenv("OCR_MAX_ATTEMPTS", "3"))
+OCR_RETRY_DELAY = int(os.getenv("OCR_RETRY_DELAY", "30"))
+OCR_POLL_INTERVAL = float(os.getenv("OCR_POLL_INTERVAL", "2"))
+
+# OCR engine: "tesserocr" (Tesseract C API, language data loaded once per worker
+# thread), "subprocess" (pytesseract, one tesseract process per image) or "auto"
+# (tesserocr when installed). Compare them with `manage.py ocr_benchmark`.
+OCR_ENGINE = os.getenv("OCR_ENGINE", "auto")
+OCR_BATCH_SIZE = int(os.getenv("OCR_BATCH_SIZE", "8"))
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+OCR_TESSDATA_PATH = os.getenv("OCR_TESSDATA_PATH") or None
+
+# Dashboard server stats: sampled in the background every SERVER_STATS_INTERVAL seconds,
+# the last SERVER_STATS_HISTORY samples feed the sparklines
+SERVER_STATS_INTERVAL = int(os.getenv("SERVER_STATS_INTERVAL", "10"))
+SERVER_STATS_HISTORY = int(os.getenv("SERVER_STATS_HISTORY", "60"))
@@ -1,13 +1,13 @@
 from django.contrib import admin
-from .models import Section, StoredFile
+from .models import Section, StoredFile, Blob, MediaUsage
 
 
 @admin.register(Section)
 class SectionAdmin(admin.ModelAdmin):
-    list_display = ("slug", "title", "created_at", "lifetime_days", "expires_at", "is_expired")
+    list_display = ("slug", "title", "created_at", "lifetime_days", "expires_at", "bytes_used", "is_expired")
     search_fields = ("slug", "title")
     list_filter = ("created_at", "lifetime_days")
-    readonly_fields = ("created_at", "expires_at", "slug")
+    readonly_fields = ("created_at", "expires_at", "slug", "bytes_used")
 
 
 @admin.register(StoredFile)
@@ -16,3 +16,16 @@ class StoredFileAdmin(admin.ModelAdmin):
     search_fields = ("original_name", "section__slug")
     list_filter = ("uploaded_at",)
     readonly_fields = ("uploaded_at",)
+
+
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ("sha256", "size", "ref_count", "created_at")
+    search_fields = ("sha256",)
+    readonly_fields = ("sha256", "size", "ref_count", "created_at")
+
+
+@admin.register(MediaUsage)
+class MediaUsageAdmin(admin.ModelAdmin):
+    list_display = ("bytes", "files", "updated_at", "reconciled_at")
+    readonly_fields = ("bytes", "files", "updated_at", "reconciled_at")
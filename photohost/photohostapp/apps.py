@@ -7,4 +7,4 @@ class PhotohostappConfig(AppConfig):
 
 
     def ready(self):
-        import photohostapp.signals
\ No newline at end of file
+        import photohostapp.signals
@@ -0,0 +1,164 @@
+"""
+Content-addressed deduplication for stored files.
+
+Each distinct content is kept once under blobs/<h[:2]>/<sha256>; a
+StoredFile's own path (sections/<slug>/<name>, as upload_to() decides) is a
+hard link to it. That keeps every existing consumer working unchanged:
+URLs, downloads and ZIPs still read the per-section path, and
+django_cleanup or an rmtree of a section directory only drop that link.
+The bytes are freed when the last link goes, i.e. once Blob.ref_count
+reaches zero and the blob's own link is removed.
+
+Storages without local paths, or filesystems without hard links, simply
+store a private copy (StoredFile.blob stays NULL).
+"""
+from django.db import transaction
+from django.db.models import Count, F
+from hashlib import sha256
+from .models import Blob, StoredFile
+from .usage import record_blob_deleted
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def blob_name(content_hash):
+    return Blob(sha256=content_hash).name
+
+
+def content_sha256(content):
+    hasher = sha256()
+    content.seek(0)
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        hasher.update(chunk)
+    content.seek(0)
+    return hasher.hexdigest()
+
+
+def _link(storage, src_name, dst_name):
+    src = storage.path(src_name)
+    dst = storage.path(dst_name)
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    os.link(src, dst)
+
+
+def link_existing_blob(stored_file, upload_name):
+    """
+    Point stored_file at the existing blob for its content_hash by hard
+    linking it to the name upload_to() picks. Returns False when there is no
+    blob to link to (or linking isn't possible), in which case the caller
+    stores the content normally.
+    """
+    storage = stored_file.file.storage
+    target = stored_file.file.field.generate_filename(stored_file, upload_name)
+
+    for _ in range(3):
+        name = storage.get_available_name(target)
+        try:
+            _link(storage, blob_name(stored_file.content_hash), name)
+        except FileExistsError:
+            continue  # somebody took the name in between, pick another one
+        except (OSError, NotImplementedError):
+            return False
+        stored_file.file.name = name
+        return True
+    return False
+
+
+def adopt_as_blob(stored_file):
+    """
+    Make a freshly saved file the blob for its content. Returns True if a
+    new blob link was created (the caller removes it again on rollback).
+    """
+    storage = stored_file.file.storage
+    try:
+        _link(storage, stored_file.file.name, blob_name(stored_file.content_hash))
+    except FileExistsError:
+        # Raced with another upload of the same content: both copies stay
+        # valid, the other one is the blob.
+        return False
+    except (OSError, NotImplementedError):
+        logger.warning("Could not link %s into the blob store", stored_file.file.name, exc_info=True)
+        return False
+    return True
+
+
+def _locked_blob(content_hash, size):
+    while True:
+        blob, _ = Blob.objects.get_or_create(sha256=content_hash, defaults={"size": size})
+        # Gone again if a delete_unreferenced_blob() held the lock: create it anew
+        locked = Blob.objects.select_for_update().filter(pk=blob.pk).first()
+        if locked is not None:
+            return locked
+
+
+def attach_blobs(stored_files):
+    """
+    Take references on the blobs of stored_files (which must all carry a
+    content_hash and be hard links into the blob store). Call inside the
+    transaction that inserts the rows.
+
+    A blob deleted after the files were linked to it (its last reference
+    went away in between) can't be attached any more: those files keep
+    blob=None, i.e. they are private copies (the hard link still holds the
+    bytes). They are returned so the caller can count them as written.
+    """
+    storage = StoredFile._meta.get_field("file").storage
+    by_hash = {}
+    for sf in stored_files:
+        by_hash.setdefault(sf.content_hash, []).append(sf)
+
+    detached = []
+    for content_hash, files in by_hash.items():
+        blob = _locked_blob(content_hash, files[0].file.size)
+        if not storage.exists(blob.name):
+            if blob.ref_count == 0:
+                blob.delete()
+            detached.extend(files)
+            continue
+        Blob.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") + len(files))
+        for sf in files:
+            sf.blob = blob
+    return detached
+
+
+def release_blob(blob_id):
+    """
+    Drop a reference to a blob; once nothing refers to it any more the
+    blob's own link is deleted after commit.
+    """
+    Blob.objects.filter(pk=blob_id, ref_count__gt=0).update(ref_count=F("ref_count") - 1)
+    transaction.on_commit(lambda: delete_unreferenced_blob(blob_id))
+
+
+def delete_unreferenced_blob(blob_id):
+    with transaction.atomic():
+        blob = Blob.objects.select_for_update().filter(pk=blob_id, ref_count=0).first()
+        if blob is None or blob.files.exists():
+            return
+        # Remove the file while the row is locked: an upload attaching to
+        # the blob waits for the lock, then finds both gone (attach_blobs)
+        try:
+            StoredFile._meta.get_field("file").storage.delete(blob.name)
+        except OSError:
+            logger.warning("Could not delete blob %s", blob.name, exc_info=True)
+        blob.delete()
+        record_blob_deleted(blob.size)
+
+
+def released_blob_bytes(stored_files):
+    """
+    Bytes that deleting the stored_files queryset will actually free in
+    the blob store: the sizes of the blobs whose every reference is in it.
+    """
+    counts = dict(
+        stored_files.exclude(blob=None).values("blob").annotate(n=Count("id")).values_list("blob", "n")
+    )
+    freed = 0
+    for pk, ref_count, size in Blob.objects.filter(pk__in=counts).values_list("pk", "ref_count", "size"):
+        if ref_count <= counts[pk]:
+            freed += size
+    return freed
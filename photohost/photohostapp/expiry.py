@@ -0,0 +1,142 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from .models import Section, StoredFile, ChunkedUpload
+from .blobs import released_blob_bytes
+from .usage import bulk_section_delete, flush_bulk_deletes, uncount_section_files
+import logging
+import os
+import shutil
+
+logger = logging.getLogger(__name__)
+
+SWEEP_BATCH_SIZE = 500
+
+
+def sweep_expired(queryset, batch_size=SWEEP_BATCH_SIZE, max_batches=None, before_delete=None, after_commit=None):
+    """
+    Delete the rows of an "already expired" queryset in bounded batches.
+
+    Every batch is a single indexed lookup followed by one
+    DELETE ... WHERE id IN (...), so the cost depends on how many rows are
+    expired, not on how many rows exist.
+
+    before_delete(ids) runs inside the batch transaction, after_commit(ids)
+    once it has been committed.
+
+    Returns the number of rows of queryset.model deleted.
+    """
+    model = queryset.model
+    deleted = 0
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        ids = list(queryset.values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            break
+
+        with transaction.atomic():
+            if before_delete:
+                before_delete(ids)
+            _, per_model = model.objects.filter(pk__in=ids).delete()
+
+        if after_commit:
+            after_commit(ids)
+
+        deleted += per_model.get(model._meta.label, 0)
+        batches += 1
+
+        if len(ids) < batch_size:
+            break
+
+    return deleted
+
+
+def _stored_bytes(names):
+    total = 0
+    for name in names:
+        try:
+            total += default_storage.size(name)
+        except OSError:
+            pass
+    return total
+
+
+def delete_expired_sections(now=None, batch_size=SWEEP_BATCH_SIZE, max_batches=None):
+    """
+    Delete expired sections together with their files.
+
+    StoredFile rows go with the CASCADE (django_cleanup removes their files
+    on commit, shared blobs are released by reference count); each
+    section's media directory is then dropped in one rmtree instead of
+    being left behind empty. The storage counter is updated once per batch,
+    not once per file.
+
+    Returns {"rows": <sections deleted>, "bytes": <bytes freed on disk>}.
+    """
+    now = now or timezone.now()
+    freed = {"bytes": 0, "dirs": []}
+
+    def before_delete(ids):
+        files = StoredFile.objects.filter(section_id__in=ids)
+        # Deduplicated files only free their bytes with the last reference to the blob
+        freed["bytes"] += _stored_bytes(files.filter(blob=None).values_list("file", flat=True))
+        freed["bytes"] += released_blob_bytes(files)
+        freed["dirs"] = list(Section.objects.filter(id__in=ids).values_list("slug", flat=True))
+        uncount_section_files(ids)
+
+    def after_commit(ids):
+        # Blobs released by the batch were deleted on commit
+        flush_bulk_deletes()
+        for slug in freed["dirs"]:
+            shutil.rmtree(os.path.join(settings.MEDIA_ROOT, "sections", slug), ignore_errors=True)
+
+    with bulk_section_delete():
+        rows = sweep_expired(
+            Section.objects.filter(expires_at__lte=now).order_by("expires_at"),
+            batch_size=batch_size,
+            max_batches=max_batches,
+            before_delete=before_delete,
+            after_commit=after_commit,
+        )
+
+    if rows:
+        logger.info(f"Cleaned up {rows} expired sections")
+    return {"rows": rows, "bytes": freed["bytes"]}
+
+
+def delete_stale_uploads(now=None, batch_size=SWEEP_BATCH_SIZE, max_batches=None):
+    """
+    Drop chunked uploads older than CHUNKED_UPLOAD_TTL_HOURS (abandoned, or
+    finalized ones whose temp files are already gone) and their temp dirs,
+    plus stray files of that age in UPLOAD_TEMP_DIR.
+    Returns the number of uploads deleted.
+    """
+    now = now or timezone.now()
+    ttl = timezone.timedelta(hours=getattr(settings, "CHUNKED_UPLOAD_TTL_HOURS", 24))
+
+    def after_commit(ids):
+        for upload_id in ids:
+            shutil.rmtree(ChunkedUpload(id=upload_id).temp_dir, ignore_errors=True)
+
+    deleted = sweep_expired(
+        ChunkedUpload.objects.filter(created_at__lte=now - ttl).order_by("created_at"),
+        batch_size=batch_size,
+        max_batches=max_batches,
+        after_commit=after_commit,
+    )
+
+    # Loose temp files left behind by a worker that died mid-upload
+    temp_dir = getattr(settings, "UPLOAD_TEMP_DIR", None)
+    if temp_dir and os.path.isdir(temp_dir):
+        cutoff = (now - ttl).timestamp()
+        with os.scandir(temp_dir) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file(follow_symlinks=False) and entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    return deleted
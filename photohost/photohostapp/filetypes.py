@@ -0,0 +1,160 @@
+"""
+File type detection for uploads.
+
+sniff() looks at the first bytes of the content (magic numbers), falls back
+to the file name, and for images reads the dimensions from the header
+only. The result is stored on StoredFile so pages and the dashboard never
+have to guess again.
+"""
+from django.conf import settings
+from PIL import Image
+from .models import StoredFile
+import codecs
+import mimetypes
+
+try:
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+except ImportError:
+    pass
+
+SNIFF_BYTES = 512
+
+# (offset, magic, content type); first match wins
+MAGIC_NUMBERS = [
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+    (0, b"II*\x00", "image/tiff"),
+    (0, b"MM\x00*", "image/tiff"),
+    (0, b"%PDF-", "application/pdf"),
+    (0, b"PK\x03\x04", "application/zip"),
+    (0, b"\x1f\x8b", "application/gzip"),
+    (0, b"7z\xbc\xaf\x27\x1c", "application/x-7z-compressed"),
+    (0, b"Rar!\x1a\x07", "application/vnd.rar"),
+    (0, b"\x1a\x45\xdf\xa3", "video/webm"),
+    (0, b"OggS", "audio/ogg"),
+    (0, b"fLaC", "audio/flac"),
+    (0, b"ID3", "audio/mpeg"),
+]
+
+# ftyp brands of ISO base media files
+FTYP_BRANDS = {
+    b"heic": "image/heic", b"heix": "image/heic", b"heim": "image/heic", b"heis": "image/heic",
+    b"hevc": "image/heic", b"hevx": "image/heic", b"mif1": "image/heif", b"msf1": "image/heif",
+    b"avif": "image/avif",
+    b"qt  ": "video/quicktime",
+    b"M4A ": "audio/mp4",
+}
+
+ARCHIVE_TYPES = {
+    "application/zip", "application/gzip", "application/x-7z-compressed", "application/vnd.rar",
+    "application/x-tar", "application/x-bzip2", "application/x-xz",
+}
+
+DOCUMENT_TYPES = {
+    "application/pdf", "application/msword", "application/rtf", "application/vnd.oasis.opendocument.text",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+}
+
+# Office files are zip containers; trust the name for those
+ZIP_BASED_TYPES = DOCUMENT_TYPES | {"application/epub+zip", "application/java-archive"}
+
+
+def _magic_type(head):
+    for offset, magic, content_type in MAGIC_NUMBERS:
+        if head[offset:offset + len(magic)] == magic:
+            return content_type
+    if head[:4] == b"RIFF":
+        return {b"WEBP": "image/webp", b"WAVE": "audio/wav", b"AVI ": "video/x-msvideo"}.get(head[8:12])
+    if head[4:8] == b"ftyp":
+        return FTYP_BRANDS.get(head[8:12], "video/mp4")
+    return None
+
+
+def _looks_like_text(head):
+    if not head or b"\x00" in head:
+        return False
+    try:
+        head.decode("utf-8")
+    except UnicodeDecodeError as exc:
+        # A multi-byte character cut off at the end of the sample is fine
+        return exc.start >= len(head) - 3 and exc.reason == "unexpected end of data"
+    return True
+
+
+def kind_for(content_type):
+    Kind = StoredFile.Kind
+    if content_type.startswith("image/"):
+        return Kind.IMAGE
+    # Only plain text gets a preview and the inline text view; HTML, CSV,
+    # JSON... are other files
+    if content_type == "text/plain":
+        return Kind.TEXT
+    if content_type.startswith("video/"):
+        return Kind.VIDEO
+    if content_type.startswith("audio/"):
+        return Kind.AUDIO
+    if content_type in ARCHIVE_TYPES:
+        return Kind.ARCHIVE
+    if content_type in DOCUMENT_TYPES:
+        return Kind.DOCUMENT
+    return Kind.OTHER
+
+
+def sniff(content, name):
+    """
+    Detect the type of an open, seekable upload. Returns a dict with
+    content_type, kind, width and height (None unless it's a decodable
+    image). Only SNIFF_BYTES plus the image header are read; the content
+    is rewound afterwards.
+    """
+    content.seek(0)
+    head = content.read(SNIFF_BYTES)
+    content.seek(0)
+
+    guessed, _ = mimetypes.guess_type(name)
+    content_type = _magic_type(head)
+    if content_type == "application/zip" and guessed in ZIP_BASED_TYPES:
+        content_type = guessed
+    if content_type is None:
+        if guessed:
+            content_type = guessed
+        elif _looks_like_text(head):
+            content_type = "text/plain"
+        else:
+            content_type = "application/octet-stream"
+
+    kind = kind_for(content_type)
+
+    width = height = None
+    if kind == StoredFile.Kind.IMAGE:
+        try:
+            with Image.open(content) as img:
+                width, height = img.size
+        except Exception:
+            pass
+        content.seek(0)
+
+    return {"content_type": content_type, "kind": kind, "width": width, "height": height}
+
+
+def read_text_preview(content, max_bytes=None):
+    """
+    Return (text, truncated): at most max_bytes (TEXT_PREVIEW_MAX_BYTES)
+    of the content decoded as UTF-8, without reading any further. A
+    character cut off at the limit is dropped. The content is rewound.
+    """
+    if max_bytes is None:
+        max_bytes = getattr(settings, "TEXT_PREVIEW_MAX_BYTES", 4096)
+
+    content.seek(0)
+    head = content.read(max_bytes + 1)
+    content.seek(0)
+
+    truncated = len(head) > max_bytes
+    text = codecs.getincrementaldecoder("utf-8")(errors="ignore").decode(head[:max_bytes], final=not truncated)
+    return text.strip(), truncated
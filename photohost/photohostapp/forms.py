@@ -25,7 +25,10 @@ class SectionCreateForm(forms.ModelForm):
 
     class Meta:
         model = Section
-        fields = ["keep_original_filenames", "lifetime_days"]
+        fields = ["title", "keep_original_filenames", "scan_coordinates", "lifetime_days"]
+        widgets = {
+            "title": forms.TextInput(attrs={"class": "form-control", "placeholder": _("Album title (optional)")}),
+        }
 
 
 class MultiFileInput(forms.FileInput):
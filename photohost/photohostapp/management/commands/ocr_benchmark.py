@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+import time
+
+from photohostapp.ocr import ENGINES, OcrError, get_engine, scan_coordinates, scan_coordinates_batch
+
+
+class Command(BaseCommand):
+    help = "Time the OCR engines on the given images and check that they read the same coordinates."
+
+    def add_arguments(self, parser):
+        parser.add_argument("images", nargs="+", help="Image files to scan.")
+        parser.add_argument(
+            "--engine",
+            action="append",
+            choices=sorted(ENGINES),
+            help="Engine to run (repeatable). Default: every engine that is installed.",
+        )
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per engine; the best one is reported.")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=getattr(settings, "OCR_BATCH_SIZE", 8),
+            help="Images per engine call in the batched run.",
+        )
+
+    def handle(self, *args, **options):
+        paths = options["images"]
+        repeat = max(1, options["repeat"])
+        batch_size = max(1, options["batch_size"])
+
+        engines = []
+        for name in options["engine"] or sorted(ENGINES):
+            try:
+                engines.append(get_engine(name))
+            except OcrError as exc:
+                self.stderr.write(f"{name}: skipped ({exc})")
+        if not engines:
+            raise CommandError("No OCR engine is available.")
+
+        results = {}
+        for engine in engines:
+            # Warm up (thread-local engine init, page cache) before timing
+            scan_coordinates(paths[0], engine=engine)
+
+            single = self._best_of(repeat, lambda: [scan_coordinates(path, engine=engine) for path in paths])
+            batched = self._best_of(repeat, lambda: [
+                result
+                for i in range(0, len(paths), batch_size)
+                for result in scan_coordinates_batch(paths[i:i + batch_size], engine=engine)
+            ])
+            results[engine.name] = batched[1]
+
+            self.stdout.write(
+                f"{engine.name:<12} one by one {single[0] * 1000 / len(paths):8.1f} ms/image   "
+                f"batches of {batch_size} {batched[0] * 1000 / len(paths):8.1f} ms/image"
+            )
+
+        if len(results) > 1:
+            reference_name, reference = next(iter(results.items()))
+            for name, found in results.items():
+                for path, expected, actual in zip(paths, reference, found):
+                    if str(expected) != str(actual):
+                        self.stdout.write(self.style.WARNING(
+                            f"{path}: {reference_name} read {expected!r}, {name} read {actual!r}"
+                        ))
+
+        for path, found in zip(paths, next(iter(results.values()))):
+            self.stdout.write(f"{path}: {found or '-'}")
+
+    @staticmethod
+    def _best_of(repeat, run):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = run()
+            elapsed = time.perf_counter() - started
+            if best is None or elapsed < best[0]:
+                best = (elapsed, result)
+        return best
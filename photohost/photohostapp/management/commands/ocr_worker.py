@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from photohostapp.ocr_queue import run_worker_pool
+
+
+class Command(BaseCommand):
+    help = "Run queued OCR coordinate scans on a pool of worker threads."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=getattr(settings, "OCR_WORKERS", 2),
+            help="Batches processed in parallel (one OCR engine each).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=getattr(settings, "OCR_BATCH_SIZE", 8),
+            help="Jobs a worker claims and sends to the OCR engine at once.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=getattr(settings, "OCR_POLL_INTERVAL", 2),
+            help="Seconds an idle worker waits before checking the queue again.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once nothing is runnable instead of waiting for new jobs.",
+        )
+
+    def handle(self, *args, **options):
+        run_worker_pool(
+            options["workers"],
+            poll_interval=options["poll_interval"],
+            once=options["once"],
+            batch_size=options["batch_size"],
+        )
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from photohostapp.usage import reconcile
+
+
+class Command(BaseCommand):
+    help = "Recount the storage used under MEDIA_ROOT (sections/ and blobs/) and fix the usage counters."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=8,
+            help="Directories scanned in parallel.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the drift, don't write the counters.",
+        )
+
+    def handle(self, *args, **options):
+        report = reconcile(workers=options["workers"], dry_run=options["dry_run"])
+        (bytes_before, bytes_after), (files_before, files_after) = report["bytes"], report["files"]
+        self.stdout.write(
+            f"sections={report['sections']} sections_fixed={report['sections_fixed']} "
+            f"bytes={bytes_before}->{bytes_after} files={files_before}->{files_after}"
+            + (" (dry run)" if options["dry_run"] else "")
+        )
@@ -0,0 +1,454 @@
+"""
+Lossless metadata stripping.
+
+Instead of decoding images to pixels and re-encoding them, these functions
+walk the container format (JPEG markers, PNG chunks, RIFF/WebP chunks,
+ISOBMFF/HEIF boxes) and drop or blank the segments that carry metadata.
+Image data is copied byte for byte in bounded chunks, so memory use does not
+depend on the image size and quality is untouched.
+"""
+import shutil
+import struct
+
+COPY_CHUNK_SIZE = 64 * 1024
+
+
+class MetadataError(ValueError):
+    """The file is not a well-formed instance of the format it claims to be."""
+
+
+def detect_format(head: bytes):
+    """Return "jpeg", "png", "webp", "heif" or None from the first 16 bytes."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    if head[4:8] == b"ftyp" and head[8:12] in (b"heic", b"heix", b"heim", b"heis", b"hevc", b"hevx", b"mif1", b"msf1", b"avif"):
+        return "heif"
+    return None
+
+
+def strip_metadata(src, dst):
+    """
+    Copy src to dst without metadata. Both are binary file objects; src must
+    be seekable (uploaded files are), dst must be seekable for HEIF.
+    Returns the detected format, or None if the format is not supported
+    (nothing is written in that case).
+    """
+    src.seek(0)
+    fmt = detect_format(src.read(16))
+    src.seek(0)
+
+    if fmt == "jpeg":
+        strip_jpeg(src, dst)
+    elif fmt == "png":
+        strip_png(src, dst)
+    elif fmt == "webp":
+        strip_webp(src, dst)
+    elif fmt == "heif":
+        strip_heif(src, dst)
+    return fmt
+
+
+def _read_exact(src, n):
+    data = src.read(n)
+    if len(data) != n:
+        raise MetadataError("Unexpected end of file")
+    return data
+
+
+def _copy_exact(src, dst, n):
+    while n > 0:
+        chunk = src.read(min(COPY_CHUNK_SIZE, n))
+        if not chunk:
+            raise MetadataError("Unexpected end of file")
+        dst.write(chunk)
+        n -= len(chunk)
+
+
+def _skip_exact(src, n):
+    while n > 0:
+        chunk = src.read(min(COPY_CHUNK_SIZE, n))
+        if not chunk:
+            raise MetadataError("Unexpected end of file")
+        n -= len(chunk)
+
+
+# ---------------------------------------------------------------- JPEG ----
+
+class _PushbackReader:
+    """File wrapper with unread() so the entropy scanner can hand back a marker."""
+    def __init__(self, f):
+        self.f = f
+        self.buf = b""
+
+    def read(self, n):
+        if self.buf:
+            data, self.buf = self.buf[:n], self.buf[n:]
+            if len(data) < n:
+                data += self.f.read(n - len(data))
+            return data
+        return self.f.read(n)
+
+    def unread(self, data):
+        self.buf = data + self.buf
+
+
+def _keep_jpeg_segment(marker, payload_head):
+    if marker == 0xE0:   # APP0: only the JFIF/JFXX header
+        return payload_head.startswith((b"JFIF\x00", b"JFXX\x00"))
+    if marker == 0xE2:   # APP2: ICC colour profile (not MPF, whose offsets we'd break)
+        return payload_head.startswith(b"ICC_PROFILE\x00")
+    if marker == 0xEE:   # APP14: Adobe colour transform flag, needed to decode CMYK/YCCK
+        return payload_head.startswith(b"Adobe")
+    if 0xE0 <= marker <= 0xEF or marker == 0xFE:   # other APPn (EXIF, XMP, IPTC, ...) and COM
+        return False
+    return True
+
+
+def _exif_orientation(payload):
+    """Orientation tag (0x0112) from an APP1 Exif payload, or None."""
+    if not payload.startswith(b"Exif\x00\x00"):
+        return None
+    tiff = payload[6:]
+    try:
+        endian = {b"II": "<", b"MM": ">"}[tiff[:2]]
+        ifd = struct.unpack(endian + "I", tiff[4:8])[0]
+        (count,) = struct.unpack(endian + "H", tiff[ifd:ifd + 2])
+        for i in range(count):
+            entry = tiff[ifd + 2 + 12 * i: ifd + 14 + 12 * i]
+            tag, typ = struct.unpack(endian + "HH", entry[:4])
+            if tag == 0x0112 and typ == 3:
+                value = struct.unpack(endian + "H", entry[8:10])[0]
+                return value if 1 <= value <= 8 else None
+    except (KeyError, struct.error):
+        return None
+    return None
+
+
+def _orientation_app1(orientation):
+    """Minimal APP1 Exif segment holding nothing but the orientation tag."""
+    tiff = b"MM\x00\x2a\x00\x00\x00\x08" + struct.pack(">HHHIHHI", 1, 0x0112, 3, 1, orientation, 0, 0)
+    payload = b"Exif\x00\x00" + tiff
+    return b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload
+
+
+def _copy_entropy_data(src, dst):
+    """Copy entropy-coded scan data up to (not including) the next real marker."""
+    while True:
+        chunk = src.read(COPY_CHUNK_SIZE)
+        if not chunk:
+            raise MetadataError("Unexpected end of scan data")
+        start = 0
+        while True:
+            i = chunk.find(b"\xff", start)
+            if i == -1:
+                dst.write(chunk)
+                break
+            if i == len(chunk) - 1:
+                nxt = src.read(1)
+                if not nxt:
+                    raise MetadataError("Unexpected end of scan data")
+                chunk += nxt
+            code = chunk[i + 1]
+            if code == 0x00 or 0xD0 <= code <= 0xD7:
+                # stuffed 0xFF or restart marker: still scan data
+                start = i + 2
+                continue
+            dst.write(chunk[:i])
+            src.unread(chunk[i:])
+            return
+
+
+def strip_jpeg(src, dst):
+    """
+    Copy a JPEG keeping only the segments needed to decode it.
+    EXIF is replaced by a minimal Exif block carrying only the orientation,
+    so phone photos keep displaying upright. Anything after EOI (MPF
+    secondary images, trailers) is dropped.
+    """
+    src = _PushbackReader(src)
+    if _read_exact(src, 2) != b"\xff\xd8":
+        raise MetadataError("Not a JPEG")
+    dst.write(b"\xff\xd8")
+
+    orientation = None
+    frame_started = False
+
+    while True:
+        if _read_exact(src, 1) != b"\xff":
+            raise MetadataError("Marker expected")
+        marker = _read_exact(src, 1)[0]
+        while marker == 0xFF:   # fill bytes
+            marker = _read_exact(src, 1)[0]
+
+        if marker == 0xD9:      # EOI
+            dst.write(b"\xff\xd9")
+            return
+        if 0xD0 <= marker <= 0xD7 or marker == 0x01:
+            dst.write(bytes((0xFF, marker)))
+            continue
+
+        length_bytes = _read_exact(src, 2)
+        (length,) = struct.unpack(">H", length_bytes)
+        if length < 2:
+            raise MetadataError("Bad segment length")
+
+        is_app = 0xE0 <= marker <= 0xEF or marker == 0xFE
+        if not is_app and not frame_started:
+            if orientation and orientation != 1:
+                dst.write(_orientation_app1(orientation))
+            frame_started = True
+
+        if is_app:
+            # APPn/COM payloads are at most 64 KB
+            payload = _read_exact(src, length - 2)
+            if marker == 0xE1 and orientation is None:
+                orientation = _exif_orientation(payload)
+            if _keep_jpeg_segment(marker, payload[:16]):
+                dst.write(bytes((0xFF, marker)) + length_bytes + payload)
+            continue
+
+        dst.write(bytes((0xFF, marker)) + length_bytes)
+        _copy_exact(src, dst, length - 2)
+
+        if marker == 0xDA:      # SOS: scan data follows
+            _copy_entropy_data(src, dst)
+
+
+# ----------------------------------------------------------------- PNG ----
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_METADATA_CHUNKS = {b"tEXt", b"zTXt", b"iTXt", b"eXIf", b"tIME"}
+
+
+def strip_png(src, dst):
+    """Copy a PNG without text, EXIF and timestamp chunks. CRCs are per chunk, so the rest is copied verbatim."""
+    if _read_exact(src, 8) != PNG_SIGNATURE:
+        raise MetadataError("Not a PNG")
+    dst.write(PNG_SIGNATURE)
+
+    while True:
+        header = _read_exact(src, 8)
+        length, ctype = struct.unpack(">I4s", header)
+        if ctype in PNG_METADATA_CHUNKS:
+            _skip_exact(src, length + 4)
+        else:
+            dst.write(header)
+            _copy_exact(src, dst, length + 4)
+        if ctype == b"IEND":
+            return
+
+
+# ---------------------------------------------------------------- WebP ----
+
+WEBP_METADATA_CHUNKS = {b"EXIF", b"XMP "}
+VP8X_EXIF_FLAG = 0x08
+VP8X_XMP_FLAG = 0x04
+
+
+def _webp_chunks(src, riff_end):
+    pos = 12
+    while pos + 8 <= riff_end:
+        src.seek(pos)
+        fourcc, size = struct.unpack("<4sI", _read_exact(src, 8))
+        padded = size + (size & 1)
+        yield pos, fourcc, size, padded
+        pos += 8 + padded
+
+
+def strip_webp(src, dst):
+    """Copy a WebP without EXIF/XMP chunks, fixing the RIFF size and VP8X flags."""
+    riff, riff_size, webp = struct.unpack("<4sI4s", _read_exact(src, 12))
+    if riff != b"RIFF" or webp != b"WEBP":
+        raise MetadataError("Not a WebP")
+    riff_end = 8 + riff_size
+
+    kept = [c for c in _webp_chunks(src, riff_end) if c[1] not in WEBP_METADATA_CHUNKS]
+    new_size = 4 + sum(8 + padded for _, _, _, padded in kept)
+    dst.write(b"RIFF" + struct.pack("<I", new_size) + b"WEBP")
+
+    for pos, fourcc, size, padded in kept:
+        src.seek(pos)
+        if fourcc == b"VP8X":
+            data = bytearray(_read_exact(src, 8 + padded))
+            data[8] &= ~(VP8X_EXIF_FLAG | VP8X_XMP_FLAG) & 0xFF
+            dst.write(bytes(data))
+        else:
+            _copy_exact(src, dst, 8 + padded)
+
+
+# ---------------------------------------------------------------- HEIF ----
+
+HEIF_META_MAX_SIZE = 16 * 1024 * 1024
+XMP_CONTENT_TYPES = {b"application/rdf+xml", b"application/xmp+xml"}
+# Exif item payload = 4 byte TIFF header offset + TIFF header + empty IFD0
+EMPTY_HEIF_EXIF = b"\x00\x00\x00\x00" + b"MM\x00\x2a\x00\x00\x00\x08" + b"\x00\x00" + b"\x00\x00\x00\x00"
+
+
+def _iter_boxes(data, start, end):
+    pos = start
+    while pos + 8 <= end:
+        size, btype = struct.unpack(">I4s", data[pos:pos + 8])
+        header = 8
+        if size == 1:
+            (size,) = struct.unpack(">Q", data[pos + 8:pos + 16])
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            raise MetadataError("Bad box size")
+        yield btype, pos, pos + header, pos + size
+        pos += size
+
+
+def _read_uint(data, pos, size):
+    if size == 0:
+        return 0, pos
+    return int.from_bytes(data[pos:pos + size], "big"), pos + size
+
+
+def _parse_iinf(data, start, end):
+    """item_ID -> item_type (b"mime" items are mapped to their content type)."""
+    version = data[start]
+    pos = start + 4 + (2 if version == 0 else 4)
+    items = {}
+    for btype, _, body, box_end in _iter_boxes(data, pos, end):
+        if btype != b"infe":
+            continue
+        v = data[body]
+        if v < 2:
+            continue
+        p = body + 4
+        if v == 2:
+            (item_id,) = struct.unpack(">H", data[p:p + 2]); p += 2
+        else:
+            (item_id,) = struct.unpack(">I", data[p:p + 4]); p += 4
+        p += 2  # protection index
+        item_type = data[p:p + 4]; p += 4
+        if item_type == b"mime":
+            p = data.index(b"\x00", p, box_end) + 1          # item_name
+            nul = data.find(b"\x00", p, box_end)
+            item_type = data[p:nul if nul != -1 else box_end]
+        items[item_id] = item_type
+    return items
+
+
+def _parse_iloc(data, start, end):
+    """item_ID -> (construction_method, [(offset, length), ...])."""
+    version = data[start]
+    p = start + 4
+    offset_size, length_size = data[p] >> 4, data[p] & 0x0F
+    base_offset_size, index_size = data[p + 1] >> 4, data[p + 1] & 0x0F
+    p += 2
+    if version < 2:
+        (count,) = struct.unpack(">H", data[p:p + 2]); p += 2
+    else:
+        (count,) = struct.unpack(">I", data[p:p + 4]); p += 4
+
+    locations = {}
+    for _ in range(count):
+        if version < 2:
+            (item_id,) = struct.unpack(">H", data[p:p + 2]); p += 2
+        else:
+            (item_id,) = struct.unpack(">I", data[p:p + 4]); p += 4
+        method = 0
+        if version in (1, 2):
+            method = struct.unpack(">H", data[p:p + 2])[0] & 0x0F; p += 2
+        p += 2  # data_reference_index
+        base, p = _read_uint(data, p, base_offset_size)
+        (extent_count,) = struct.unpack(">H", data[p:p + 2]); p += 2
+        extents = []
+        for _ in range(extent_count):
+            if version in (1, 2) and index_size:
+                p += index_size
+            off, p = _read_uint(data, p, offset_size)
+            length, p = _read_uint(data, p, length_size)
+            extents.append((base + off, length))
+        if p > end:
+            raise MetadataError("iloc box truncated")
+        locations[item_id] = (method, extents)
+    return locations
+
+
+def strip_heif(src, dst):
+    """
+    Copy a HEIF/HEIC file and blank its Exif and XMP items in place.
+
+    Removing items would shift every offset in the file, so the item
+    payloads are overwritten instead: Exif with an empty but valid TIFF
+    header, XMP with whitespace. Image data is untouched.
+    """
+    shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+
+    src.seek(0, 2)
+    file_size = src.tell()
+    pos = 0
+    meta = None
+    while pos + 8 <= file_size:
+        src.seek(pos)
+        size, btype = struct.unpack(">I4s", _read_exact(src, 8))
+        header = 8
+        if size == 1:
+            (size,) = struct.unpack(">Q", _read_exact(src, 8))
+            header = 16
+        elif size == 0:
+            size = file_size - pos
+        if size < header:
+            raise MetadataError("Bad box size")
+        if btype == b"meta":
+            if size > HEIF_META_MAX_SIZE:
+                raise MetadataError("meta box too large")
+            src.seek(pos)
+            meta = (pos, _read_exact(src, size), header)
+            break
+        pos += size
+
+    if meta is None:
+        return
+
+    meta_pos, data, header = meta
+    items, locations, idat_start = {}, {}, None
+    try:
+        # meta is a FullBox: skip version/flags
+        for btype, box_start, body, box_end in _iter_boxes(data, header + 4, len(data)):
+            if btype == b"iinf":
+                items = _parse_iinf(data, body, box_end)
+            elif btype == b"iloc":
+                locations = _parse_iloc(data, body, box_end)
+            elif btype == b"idat":
+                idat_start = meta_pos + body
+    except MetadataError:
+        raise
+    except (struct.error, IndexError, ValueError) as exc:
+        # Truncated fields, an infe without its NUL terminators, ...
+        raise MetadataError(f"Malformed meta box: {exc}") from exc
+
+    for item_id, item_type in items.items():
+        if item_type == b"Exif":
+            head, pad = EMPTY_HEIF_EXIF, b"\x00"
+        elif item_type in XMP_CONTENT_TYPES:
+            head, pad = b"", b" "
+        else:
+            continue
+
+        method, extents = locations.get(item_id, (None, []))
+        if method == 1:
+            if idat_start is None:
+                continue
+            extents = [(idat_start + off, length) for off, length in extents]
+        elif method != 0:
+            continue
+
+        for off, length in extents:
+            if off + length > file_size:
+                raise MetadataError("Item extent outside file")
+            if len(head) > length:
+                head = b""
+            dst.seek(off)
+            dst.write(head + pad * (length - len(head)))
+            head = b""   # only the first extent carries the header
+
+    dst.seek(0, 2)
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.9 on 2026-10-17 10:12
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_expires_at(apps, schema_editor):
+    Section = apps.get_model("photohostapp", "Section")
+    batch = []
+    for section in Section.objects.only("id", "created_at", "lifetime_days").iterator(chunk_size=2000):
+        section.expires_at = section.created_at + timezone.timedelta(days=section.lifetime_days)
+        batch.append(section)
+        if len(batch) >= 2000:
+            Section.objects.bulk_update(batch, ["expires_at"])
+            batch = []
+    if batch:
+        Section.objects.bulk_update(batch, ["expires_at"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("photohostapp", "0009_delete_secretnote"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="section",
+            name="expires_at",
+            field=models.DateTimeField(db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_expires_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="section",
+            name="expires_at",
+            field=models.DateTimeField(db_index=True, editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-17 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("photohostapp", "0010_section_expires_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="storedfile",
+            name="content_hash",
+            field=models.CharField(blank=True, db_index=True, default="", max_length=64),
+        ),
+    ]
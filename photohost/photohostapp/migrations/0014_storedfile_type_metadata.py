@@ -0,0 +1,89 @@
+# Generated by Django 5.2.9 on 2026-10-17 15:40
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+import mimetypes
+
+# Snapshot of filetypes.kind_for() so this migration doesn't change with the app code
+ARCHIVE_TYPES = {
+    "application/zip", "application/gzip", "application/x-7z-compressed", "application/vnd.rar",
+    "application/x-tar", "application/x-bzip2", "application/x-xz",
+}
+DOCUMENT_TYPES = {
+    "application/pdf", "application/msword", "application/rtf", "application/vnd.oasis.opendocument.text",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+}
+
+
+def kind_for(content_type):
+    if content_type.startswith("image/"):
+        return "image"
+    if content_type == "text/plain":
+        return "text"
+    if content_type.startswith("video/"):
+        return "video"
+    if content_type.startswith("audio/"):
+        return "audio"
+    if content_type in ARCHIVE_TYPES:
+        return "archive"
+    if content_type in DOCUMENT_TYPES:
+        return "document"
+    return "other"
+
+
+def fill_type_metadata(apps, schema_editor):
+    # Existing rows: type from the name, size from storage. New uploads are sniffed.
+    StoredFile = apps.get_model("photohostapp", "StoredFile")
+    batch = []
+    for sf in StoredFile.objects.only("id", "original_name", "file").iterator(chunk_size=2000):
+        content_type, _ = mimetypes.guess_type(sf.original_name or sf.file.name)
+        sf.content_type = content_type or "application/octet-stream"
+        sf.kind = kind_for(sf.content_type)
+        try:
+            sf.size_bytes = default_storage.size(sf.file.name)
+        except OSError:
+            pass
+        batch.append(sf)
+        if len(batch) >= 2000:
+            StoredFile.objects.bulk_update(batch, ["content_type", "kind", "size_bytes"])
+            batch = []
+    if batch:
+        StoredFile.objects.bulk_update(batch, ["content_type", "kind", "size_bytes"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("photohostapp", "0013_blob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="storedfile",
+            name="content_type",
+            field=models.CharField(blank=True, default="", max_length=100),
+        ),
+        migrations.AddField(
+            model_name="storedfile",
+            name="height",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="storedfile",
+            name="kind",
+            field=models.CharField(choices=[("image", "Image"), ("text", "Text"), ("video", "Video"), ("audio", "Audio"), ("document", "Document"), ("archive", "Archive"), ("other", "Other")], db_index=True, default="other", max_length=16),
+        ),
+        migrations.AddField(
+            model_name="storedfile",
+            name="size_bytes",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="storedfile",
+            name="width",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(fill_type_metadata, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.9 on 2026-10-17 16:05
+
+from django.conf import settings
+from django.db import migrations, models
+import codecs
+
+
+def read_text_preview(fh, max_bytes):
+    # Snapshot of filetypes.read_text_preview() so this migration doesn't change with the app code
+    head = fh.read(max_bytes + 1)
+    truncated = len(head) > max_bytes
+    text = codecs.getincrementaldecoder("utf-8")(errors="ignore").decode(head[:max_bytes], final=not truncated)
+    return text.strip(), truncated
+
+
+def fill_text_previews(apps, schema_editor):
+    # Bounded read of existing text files; nothing past the preview size is loaded
+    max_bytes = getattr(settings, "TEXT_PREVIEW_MAX_BYTES", 4096)
+    StoredFile = apps.get_model("photohostapp", "StoredFile")
+    batch = []
+    for sf in StoredFile.objects.filter(kind="text").only("id", "file").iterator(chunk_size=500):
+        try:
+            with sf.file.open("rb") as fh:
+                sf.text_preview, sf.text_truncated = read_text_preview(fh, max_bytes)
+        except OSError:
+            continue
+        batch.append(sf)
+        if len(batch) >= 500:
+            StoredFile.objects.bulk_update(batch, ["text_preview", "text_truncated"])
+            batch = []
+    if batch:
+        StoredFile.objects.bulk_update(batch, ["text_preview", "text_truncated"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("photohostapp", "0014_storedfile_type_metadata"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="storedfile",
+            name="text_preview",
+            field=models.TextField(blank=True, default=""),
+        ),
+        migrations.AddField(
+            model_name="storedfile",
+            name="text_truncated",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(fill_text_previews, migrations.RunPython.noop),
+    ]
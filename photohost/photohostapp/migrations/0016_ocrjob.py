@@ -0,0 +1,38 @@
+# Generated by Django 5.2.9 on 2026-10-17 16:30
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("photohostapp", "0015_storedfile_text_preview"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chunkedupload",
+            name="scan_coordinates",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="section",
+            name="scan_coordinates",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name="OcrJob",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("status", models.CharField(choices=[("queued", "Queued"), ("running", "Running"), ("done", "Done"), ("failed", "Failed")], db_index=True, default="queued", max_length=10)),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("run_after", models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ("locked_until", models.DateTimeField(blank=True, null=True)),
+                ("last_error", models.TextField(blank=True, default="")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("stored_file", models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name="ocr_job", to="photohostapp.storedfile")),
+            ],
+        ),
+    ]
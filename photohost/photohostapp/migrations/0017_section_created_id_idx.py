@@ -0,0 +1,17 @@
+# Generated by Django 5.2.9 on 2026-10-17 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("photohostapp", "0016_ocrjob"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="section",
+            index=models.Index(fields=["created_at", "id"], name="section_created_id_idx"),
+        ),
+    ]
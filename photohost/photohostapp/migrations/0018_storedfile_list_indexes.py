@@ -0,0 +1,22 @@
+# Generated by Django 5.2.9 on 2026-10-17 17:45
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("photohostapp", "0017_section_created_id_idx"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="storedfile",
+            index=models.Index(fields=["uploaded_at", "id"], name="storedfile_uploaded_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="storedfile",
+            index=models.Index(django.db.models.functions.text.Lower("original_name"), name="storedfile_name_lower_idx"),
+        ),
+    ]
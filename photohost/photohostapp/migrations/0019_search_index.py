@@ -0,0 +1,50 @@
+# Generated by Django 5.2.9 on 2026-10-17 18:20
+
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE photohostapp_file_search USING fts5(name, slug, tokenize='trigram')",
+    "CREATE VIRTUAL TABLE photohostapp_section_search USING fts5(slug, title, tokenize='trigram')",
+    "INSERT INTO photohostapp_file_search (rowid, name, slug) "
+    "SELECT f.id, f.original_name, s.slug FROM photohostapp_storedfile f "
+    "JOIN photohostapp_section s ON s.id = f.section_id",
+    "INSERT INTO photohostapp_section_search (rowid, slug, title) "
+    "SELECT id, slug, title FROM photohostapp_section",
+]
+SQLITE_BACKWARD = [
+    "DROP TABLE IF EXISTS photohostapp_file_search",
+    "DROP TABLE IF EXISTS photohostapp_section_search",
+]
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS storedfile_name_trgm_idx ON photohostapp_storedfile USING gin (original_name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS section_slug_trgm_idx ON photohostapp_section USING gin (slug gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS section_title_trgm_idx ON photohostapp_section USING gin (title gin_trgm_ops)",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS storedfile_name_trgm_idx",
+    "DROP INDEX IF EXISTS section_slug_trgm_idx",
+    "DROP INDEX IF EXISTS section_title_trgm_idx",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("photohostapp", "0018_storedfile_list_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({"sqlite": SQLITE_FORWARD, "postgresql": POSTGRES_FORWARD}),
+            _run({"sqlite": SQLITE_BACKWARD, "postgresql": POSTGRES_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.9 on 2026-10-17 19:05
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_usage(apps, schema_editor):
+    # Counters from the rows; `manage.py reconcile_media_usage` checks them against the disk
+    Section = apps.get_model("photohostapp", "Section")
+    StoredFile = apps.get_model("photohostapp", "StoredFile")
+    Blob = apps.get_model("photohostapp", "Blob")
+    MediaUsage = apps.get_model("photohostapp", "MediaUsage")
+
+    section_bytes = (
+        StoredFile.objects.filter(section=OuterRef("pk"))
+        .values("section")
+        .annotate(total=Sum("size_bytes"))
+        .values("total")
+    )
+    Section.objects.update(bytes_used=Coalesce(Subquery(section_bytes), 0))
+
+    private = StoredFile.objects.filter(blob=None).aggregate(total=Sum("size_bytes"))["total"] or 0
+    shared = Blob.objects.filter(ref_count__gt=0).aggregate(total=Sum("size"))["total"] or 0
+    MediaUsage.objects.update_or_create(
+        pk=1, defaults={"bytes": private + shared, "files": StoredFile.objects.count()}
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("photohostapp", "0019_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MediaUsage",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("bytes", models.BigIntegerField(default=0)),
+                ("files", models.BigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("reconciled_at", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="section",
+            name="bytes_used",
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_usage, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-17 19:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("photohostapp", "0020_media_usage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chunkedupload",
+            name="finalizing_since",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="chunkedupload",
+            name="title",
+            field=models.CharField(blank=True, max_length=200),
+        ),
+    ]
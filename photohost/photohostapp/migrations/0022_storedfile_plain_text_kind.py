@@ -0,0 +1,22 @@
+# Generated by Django 5.2.9 on 2026-10-17 19:55
+
+from django.db import migrations
+
+
+def reclassify_text(apps, schema_editor):
+    # Only text/plain is "text" now; HTML, CSV, JSON... uploaded before lose the preview
+    StoredFile = apps.get_model("photohostapp", "StoredFile")
+    StoredFile.objects.filter(kind="text").exclude(content_type="text/plain").update(
+        kind="other", text_preview="", text_truncated=False
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("photohostapp", "0021_chunkedupload_title_finalizing"),
+    ]
+
+    operations = [
+        migrations.RunPython(reclassify_text, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-17 20:10
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("photohostapp", "0022_storedfile_plain_text_kind"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="section",
+            index=models.Index(django.db.models.functions.text.Lower("slug"), name="section_slug_lower_idx"),
+        ),
+    ]
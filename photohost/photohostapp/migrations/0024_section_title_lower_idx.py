@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-17 21:40
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("photohostapp", "0023_section_slug_lower_idx"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="section",
+            index=models.Index(django.db.models.functions.text.Lower("title"), name="section_title_lower_idx"),
+        ),
+    ]
@@ -1,6 +1,9 @@
+from django.conf import settings
 from django.db import models
+from django.db.models.functions import Lower
 from django.utils import timezone
 from django.utils.crypto import get_random_string
+import os
 import uuid
 
 class Section(models.Model):
@@ -9,18 +12,43 @@ class Section(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     lifetime_days = models.PositiveSmallIntegerField(default=7)
     keep_original_filenames = models.BooleanField(default=False)
+    # Queue an OCR job per image to read coordinates written on the photo
+    scan_coordinates = models.BooleanField(default=False)
     batch_id = models.UUIDField(null=True, blank=True, db_index=True)
-    def save(self, *args, **kwargs):
+    # Stored (not computed) so expiry sweeps can use the index instead of scanning every row
+    expires_at = models.DateTimeField(db_index=True, editable=False)
+    # Bytes of the section's files, kept up to date on upload and delete (usage.py)
+    bytes_used = models.PositiveBigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # Dashboard list: newest first, keyset-paginated on (created_at, id)
+            models.Index(fields=["created_at", "id"], name="section_created_id_idx"),
+            # Case-insensitive slug prefix search (slugs are mixed-case)
+            models.Index(Lower("slug"), name="section_slug_lower_idx"),
+            # ... and title prefix search for terms too short for the search index
+            models.Index(Lower("title"), name="section_title_lower_idx"),
+        ]
+
+    def assign_slug(self):
         if not self.slug:
             self.slug = get_random_string(8)
+
+    def save(self, *args, **kwargs):
+        self.assign_slug()
+        self.expires_at = self.compute_expires_at()
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"created_at", "lifetime_days"} & set(update_fields):
+            kwargs["update_fields"] = set(update_fields) | {"expires_at"}
+
         super().save(*args, **kwargs)
 
-    @property
-    def expires_at(self):
+    def compute_expires_at(self):
         return self.created_at + timezone.timedelta(days=self.lifetime_days)
 
     def is_expired(self):
-        exp = self.expires_at
+        exp = self.expires_at or self.compute_expires_at()
 
         # Normalize timezone safety
         if timezone.is_naive(exp):
@@ -31,6 +59,43 @@ class Section(models.Model):
     def __str__(self):
         return f"Section {self.slug}"
 
+class Blob(models.Model):
+    """
+    One copy of some stored content, keyed by its SHA-256.
+
+    The bytes live at name (under MEDIA_ROOT) and every StoredFile with the
+    same content is a hard link to them, so the file is only written once.
+    ref_count is the number of StoredFile rows using the blob; the blob goes
+    away when it drops to zero (see blobs.py).
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @property
+    def name(self):
+        return f"blobs/{self.sha256[:2]}/{self.sha256}"
+
+    def __str__(self):
+        return self.sha256
+
+
+class MediaUsage(models.Model):
+    """
+    Storage used by uploads (sections/ and blobs/ under MEDIA_ROOT), as a
+    single row of counters updated with every upload and delete (see
+    usage.py). bytes counts shared blobs once, i.e. what is really on disk.
+    `manage.py reconcile_media_usage` recounts it from the tree.
+    """
+    bytes = models.BigIntegerField(default=0)
+    files = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    reconciled_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"MediaUsage {self.bytes} bytes in {self.files} files"
+
 def upload_to(instance, filename):
     ext = filename.rsplit(".", 1)[-1] if "." in filename else ""
 
@@ -42,15 +107,111 @@ def upload_to(instance, filename):
     return f"sections/{instance.section.slug}/{final_name}"
 
 class StoredFile(models.Model):
+    class Kind(models.TextChoices):
+        IMAGE = "image", "Image"
+        TEXT = "text", "Text"
+        VIDEO = "video", "Video"
+        AUDIO = "audio", "Audio"
+        DOCUMENT = "document", "Document"
+        ARCHIVE = "archive", "Archive"
+        OTHER = "other", "Other"
+
     section = models.ForeignKey(Section, related_name="files", on_delete=models.CASCADE)
     original_name = models.CharField(max_length=512)
     file = models.FileField(upload_to=upload_to)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     coordinates = models.CharField(max_length=100, blank=True, null=True)
+    # SHA-256 of the stored bytes; keys the derivative (thumbnail) cache
+    content_hash = models.CharField(max_length=64, blank=True, default="", db_index=True)
+    # Shared copy this file is linked to; NULL when it was stored on its own
+    blob = models.ForeignKey(Blob, null=True, blank=True, related_name="files", on_delete=models.PROTECT)
+    # Sniffed at upload (filetypes.py) so pages never guess from the name again
+    content_type = models.CharField(max_length=100, blank=True, default="")
+    size_bytes = models.PositiveBigIntegerField(default=0)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    kind = models.CharField(max_length=16, choices=Kind.choices, default=Kind.OTHER, db_index=True)
+    # First TEXT_PREVIEW_MAX_BYTES of text files; the rest is fetched on demand
+    text_preview = models.TextField(blank=True, default="")
+    text_truncated = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # Dashboard list: newest first, keyset-paginated on (uploaded_at, id)
+            models.Index(fields=["uploaded_at", "id"], name="storedfile_uploaded_id_idx"),
+            # Case-insensitive name prefix search (range on LOWER(original_name))
+            models.Index(Lower("original_name"), name="storedfile_name_lower_idx"),
+        ]
 
     def __str__(self):
         return self.original_name
 
 
+class OcrJob(models.Model):
+    """
+    A queued coordinate scan of one image, run by `manage.py ocr_worker`
+    (see ocr_queue.py). locked_until is the lease of the worker running it;
+    a job whose lease ran out is picked up again.
+    """
+    class Status(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    stored_file = models.OneToOneField(StoredFile, related_name="ocr_job", on_delete=models.CASCADE)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED, db_index=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now, db_index=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"OcrJob {self.stored_file_id} ({self.status})"
+
+
+class ChunkedUpload(models.Model):
+    """
+    A resumable album upload: files are declared, then appended to in
+    chunks, and attached to a new Section at finalize.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    title = models.CharField(max_length=200, blank=True)
+    lifetime_days = models.PositiveSmallIntegerField(default=7)
+    keep_original_filenames = models.BooleanField(default=False)
+    scan_coordinates = models.BooleanField(default=False)
+    section = models.ForeignKey(Section, null=True, blank=True, on_delete=models.SET_NULL)
+    # Set while a finalize request builds the section, so a retry can't build a second one
+    finalizing_since = models.DateTimeField(null=True, blank=True)
 
+    @property
+    def temp_dir(self):
+        base = (
+            getattr(settings, "CHUNKED_UPLOAD_TEMP_DIR", None)
+            or getattr(settings, "UPLOAD_TEMP_DIR", None)
+            or os.path.join(settings.MEDIA_ROOT, "uploads_tmp")
+        )
+        return os.path.join(base, self.id.hex)
 
+    def __str__(self):
+        return f"ChunkedUpload {self.id}"
+
+
+class ChunkedUploadFile(models.Model):
+    upload = models.ForeignKey(ChunkedUpload, related_name="files", on_delete=models.CASCADE)
+    name = models.CharField(max_length=512)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)  # bytes acknowledged so far
+
+    @property
+    def temp_path(self):
+        return os.path.join(self.upload.temp_dir, f"{self.id}.part")
+
+    @property
+    def is_complete(self):
+        return self.offset == self.size
+
+    def __str__(self):
+        return self.name
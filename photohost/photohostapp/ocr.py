@@ -1,27 +1,362 @@
-import pytesseract
-from PIL import Image
+from django.conf import settings
+from PIL import Image, ImageOps
+import logging
 import os
+import re
+import threading
+import time
 
-# Windows-only: explicitly set path if needed
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
 
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
 
-IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp'}
+try:
+    import cv2
+    import numpy as np
+except ImportError:
+    cv2 = np = None
 
+try:
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+except ImportError:
+    pass
 
-def extract_text_from_image(file_path: str) -> str:
+logger = logging.getLogger(__name__)
+
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp', '.heic', '.heif'}
+
+# Where users are asked to put the coordinates (white text on black, at the
+# top): (top, bottom) fractions of the image height, tried in order.
+ROI_BANDS = [(0.0, 0.12), (0.0, 0.25), (0.88, 1.0)]
+
+# Bands are processed at most this wide; the decoder downscales JPEGs to it
+ROI_MAX_WIDTH = 1600
+
+# Tesseract reads best at ~30 px text height; larger only costs time
+TARGET_TEXT_HEIGHT = 32
+LINE_PADDING = 10
+
+# One line, digits and coordinate punctuation only
+LINE_WHITELIST = "0123456789.,-+NSEW"
+LINE_CONFIG = f"--psm 7 -c tessedit_char_whitelist={LINE_WHITELIST}"
+
+# Decimal degrees with at least 3 decimals, optional hemisphere letters:
+# "50.4501, 30.5234", "-33.8688 151.2093", "50.4501N 30.5234E"
+LAT = r"[-+]?(?:90(?:\.0{3,})|[1-8]?\d\.\d{3,})"
+LON = r"[-+]?(?:180(?:\.0{3,})|(?:1[0-7]\d|[1-9]?\d)\.\d{3,})"
+COORDINATES_RE = re.compile(
+    rf"(?<![\d.])({LAT})\s*([NS])?\s*[,;\s]\s*({LON})\s*([EW])?(?![\d.])"
+)
+
+
+class OcrError(Exception):
+    pass
+
+
+def _tesseract():
+    if pytesseract is None:
+        raise OcrError("pytesseract is not installed")
+    # Only needed when tesseract is not on PATH (e.g. Windows installs)
+    cmd = getattr(settings, "TESSERACT_CMD", None)
+    if cmd:
+        pytesseract.pytesseract.tesseract_cmd = cmd
+    return pytesseract
+
+
+def extract_text_from_image(file_path: str, timeout: int = 0) -> str:
     """
-    Extract text from an image file using Tesseract OCR
+    Extract text from an image file using Tesseract OCR.
+    Returns "" for files that aren't images; raises OcrError if OCR fails
+    or takes longer than timeout seconds (0 = no limit).
     """
     ext = os.path.splitext(file_path)[1].lower()
     if ext not in IMAGE_EXTENSIONS:
         return ""
 
+    tesseract = _tesseract()
     try:
         with Image.open(file_path) as img:
             # Convert to RGB for better OCR results
             img = img.convert("RGB")
-            text = pytesseract.image_to_string(img)
+            text = tesseract.image_to_string(img, timeout=timeout)
             return text.strip()
     except Exception as e:
-        return f"OCR failed: {e}"
+        raise OcrError(f"OCR failed: {e}") from e
+
+
+def find_coordinates(text: str) -> str:
+    """The first "lat, lon" pair in text as signed decimal degrees, or ""."""
+    match = COORDINATES_RE.search(text)
+    if not match:
+        return ""
+    lat, ns, lon, ew = match.groups()
+    if ns == "S" and not lat.startswith("-"):
+        lat = "-" + lat.lstrip("+")
+    if ew == "W" and not lon.startswith("-"):
+        lon = "-" + lon.lstrip("+")
+    return f"{lat.lstrip('+')}, {lon.lstrip('+')}"
+
+
+def _load_gray(file_path):
+    """The image as a grayscale array, upright and at most ~ROI_MAX_WIDTH wide"""
+    with Image.open(file_path) as img:
+        width, height = img.size
+        if width > ROI_MAX_WIDTH:
+            # JPEG: decode at 1/2, 1/4 or 1/8 scale instead of full resolution
+            img.draft("L", (ROI_MAX_WIDTH, height * ROI_MAX_WIDTH // width))
+        img = ImageOps.exif_transpose(img).convert("L")
+        gray = np.asarray(img)
+
+    if gray.shape[1] > ROI_MAX_WIDTH:
+        scale = ROI_MAX_WIDTH / gray.shape[1]
+        gray = cv2.resize(gray, (ROI_MAX_WIDTH, max(1, round(gray.shape[0] * scale))), interpolation=cv2.INTER_AREA)
+    return gray
+
+
+def _longest_run(mask, max_gap):
+    """(start, end) of the longest run of True in mask, bridging gaps up to max_gap"""
+    best = None
+    start = last = None
+    for i in np.flatnonzero(mask):
+        if start is None or i - last > max_gap + 1:
+            if start is not None and (best is None or last - start > best[1] - best[0]):
+                best = (start, last)
+            start = i
+        last = i
+    if start is not None and (best is None or last - start > best[1] - best[0]):
+        best = (start, last)
+    return best
+
+
+def _dark_banner(band):
+    """The black label the coordinates are written on, if the band has one"""
+    dark = band < 64
+    rows = _longest_run(dark.mean(axis=1) > 0.3, max_gap=2)
+    if rows is None or rows[1] - rows[0] < 8:
+        return band
+    label = dark[rows[0]:rows[1] + 1]
+    cols = _longest_run(label.mean(axis=0) > 0.6, max_gap=label.shape[0])
+    if cols is None or cols[1] - cols[0] < 8:
+        return band
+    return band[rows[0]:rows[1] + 1, cols[0]:cols[1] + 1]
+
+
+def _binarize(gray):
+    """Otsu threshold, flipped if needed so the text ends up black on white"""
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    if np.count_nonzero(binary) < binary.size / 2:
+        binary = cv2.bitwise_not(binary)
+    return binary
+
+
+def _text_line(binary):
+    """Crop binary (black text on white) to its main text line, or None if blank"""
+    ink = binary == 0
+    rows = ink.sum(axis=1) > max(2, binary.shape[1] // 200)
+    row_run = _longest_run(rows, max_gap=2)
+    if row_run is None:
+        return None
+    top, bottom = row_run
+    cols = ink[top:bottom + 1].any(axis=0)
+    col_run = _longest_run(cols, max_gap=binary.shape[1])
+    left, right = col_run
+    return binary[top:bottom + 1, left:right + 1]
+
+
+def _prepare_line(line):
+    """Scale a text line to TARGET_TEXT_HEIGHT and give it a white margin"""
+    height, width = line.shape
+    scale = TARGET_TEXT_HEIGHT / height
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+    line = cv2.resize(line, (max(1, round(width * scale)), TARGET_TEXT_HEIGHT), interpolation=interpolation)
+    _, line = cv2.threshold(line, 127, 255, cv2.THRESH_BINARY)
+    return cv2.copyMakeBorder(line, LINE_PADDING, LINE_PADDING, LINE_PADDING, LINE_PADDING, cv2.BORDER_CONSTANT, value=255)
+
+
+def coordinate_regions(file_path):
+    """
+    Yield the preprocessed single-line crops worth sending to Tesseract, best
+    candidate first: each ROI band is cut to its dark label (if any),
+    binarized and cut down to its main text line.
+    """
+    gray = _load_gray(file_path)
+    height = gray.shape[0]
+    for top, bottom in ROI_BANDS:
+        band = gray[int(height * top):max(int(height * bottom), int(height * top) + 1)]
+        line = _text_line(_binarize(_dark_banner(band)))
+        if line is not None and line.shape[0] >= 4:
+            yield _prepare_line(line)
+
+
+class SubprocessEngine:
+    """pytesseract: one tesseract process (and language-data load) per image"""
+    name = "subprocess"
+
+    def __init__(self):
+        self.tesseract = _tesseract()
+
+    def recognize(self, images, timeout=0):
+        deadline = time.monotonic() + timeout if timeout else None
+        texts = []
+        for image in images:
+            remaining = 0
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise OcrError("OCR timed out")
+            texts.append(self.tesseract.image_to_string(image, config=LINE_CONFIG, timeout=remaining))
+        return texts
+
+
+class TesserocrEngine:
+    """
+    tesserocr (Tesseract C API): every thread keeps its own initialised
+    engine, so language data is loaded once per worker thread and images are
+    recognised in-process, without temp files. Recognition releases the
+    GIL, so worker threads run in parallel. A recognition call can't be
+    interrupted: the timeout is only checked between images, and the job
+    lease covers a hung call.
+    """
+    name = "tesserocr"
+
+    def __init__(self):
+        if tesserocr is None:
+            raise OcrError("tesserocr is not installed")
+        self.local = threading.local()
+        self.warned_timeout = False
+
+    def _api(self):
+        api = getattr(self.local, "api", None)
+        if api is None:
+            kwargs = {"lang": getattr(settings, "OCR_LANG", "eng"), "psm": tesserocr.PSM.SINGLE_LINE}
+            tessdata = getattr(settings, "OCR_TESSDATA_PATH", None)
+            if tessdata:
+                kwargs["path"] = tessdata
+            api = tesserocr.PyTessBaseAPI(**kwargs)
+            api.SetVariable("tessedit_char_whitelist", LINE_WHITELIST)
+            self.local.api = api
+        return api
+
+    def recognize(self, images, timeout=0):
+        if timeout and not self.warned_timeout:
+            self.warned_timeout = True
+            logger.warning(
+                "The tesserocr OCR engine can't interrupt a running recognition; "
+                "the OCR timeout is only checked between images"
+            )
+        deadline = time.monotonic() + timeout if timeout else None
+        api = self._api()
+        texts = []
+        for image in images:
+            if deadline is not None and time.monotonic() >= deadline:
+                raise OcrError("OCR timed out")
+            api.SetImage(Image.fromarray(image))
+            texts.append(api.GetUTF8Text())
+        return texts
+
+
+ENGINES = {engine.name: engine for engine in (TesserocrEngine, SubprocessEngine)}
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine(name=None):
+    """
+    The OCR engine named by OCR_ENGINE: "tesserocr", "subprocess" or "auto"
+    (tesserocr when installed, else the subprocess backend). Without a name
+    argument the instance is shared process-wide.
+    """
+    global _engine
+    if name is not None:
+        return ENGINES[name]()
+
+    with _engine_lock:
+        if _engine is None:
+            name = getattr(settings, "OCR_ENGINE", "auto")
+            if name == "auto":
+                name = "tesserocr" if tesserocr is not None else "subprocess"
+            _engine = ENGINES[name]()
+        return _engine
+
+
+def scan_coordinates_batch(file_paths, timeout=0, engine=None):
+    """
+    Read coordinates written on each image. Only small binarized text-line
+    crops of the ROI bands go through Tesseract, in single-line mode with a
+    digits-and-punctuation whitelist; the crops of all images are sent to
+    the engine together, one ROI band per round, until every image has a
+    result.
+
+    Returns one entry per path: the coordinates ("" if none were found) or
+    the OcrError for that image. timeout (seconds per image, 0 = none)
+    bounds the whole batch; when it runs out or the engine fails, the
+    images still unresolved get that OcrError and the coordinates already
+    found are kept.
+    """
+    if cv2 is None:
+        raise OcrError("opencv-python is not installed")
+    engine = engine or get_engine()
+    deadline = time.monotonic() + timeout * len(file_paths) if timeout else None
+
+    results = [""] * len(file_paths)
+    regions = {}
+    for i, file_path in enumerate(file_paths):
+        if os.path.splitext(file_path)[1].lower() in IMAGE_EXTENSIONS:
+            regions[i] = coordinate_regions(file_path)
+
+    while regions:
+        batch = []
+        for i, region_iter in list(regions.items()):
+            try:
+                batch.append((i, next(region_iter)))
+            except StopIteration:
+                del regions[i]
+            except Exception as e:
+                results[i] = OcrError(f"OCR failed: {e}")
+                del regions[i]
+        if not batch:
+            break
+
+        error = None
+        remaining = 0
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                error = OcrError("OCR timed out")
+        if error is None:
+            try:
+                texts = engine.recognize([region for _, region in batch], timeout=remaining)
+            except OcrError as e:
+                error = e
+            except Exception as e:
+                error = OcrError(f"OCR failed: {e}")
+                error.__cause__ = e
+        if error is not None:
+            for i in regions:
+                results[i] = error
+            break
+
+        for (i, _), text in zip(batch, texts):
+            coordinates = find_coordinates(text)
+            if coordinates:
+                results[i] = coordinates
+                del regions[i]
+
+    return results
+
+
+def scan_coordinates(file_path: str, timeout: int = 0, engine=None) -> str:
+    """scan_coordinates_batch() for one image; raises its OcrError"""
+    result = scan_coordinates_batch([file_path], timeout=timeout, engine=engine)[0]
+    if isinstance(result, OcrError):
+        raise result
+    return result
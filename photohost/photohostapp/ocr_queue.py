@@ -0,0 +1,170 @@
+"""
+Persistent queue of coordinate scans (OcrJob rows).
+
+Uploads only insert the jobs; `manage.py ocr_worker` runs them on a pool of
+threads, each claiming up to OCR_BATCH_SIZE jobs at a time with conditional
+UPDATEs, so any number of worker processes can share the table. The images
+of a batch go through the OCR engine together (see ocr.get_engine()). A
+claimed job holds a lease of OCR_JOB_TIMEOUT seconds per job in the batch
+(plus slack); if the worker dies the lease runs out and another worker
+picks the job up. Failures are retried with exponential backoff until
+OCR_MAX_ATTEMPTS.
+"""
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import OcrJob, StoredFile
+from .ocr import scan_coordinates_batch
+from .section_cache import invalidate_section
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Extra lease time on top of the Tesseract timeout before a job counts as lost
+LEASE_SLACK_SECONDS = 30
+
+CLAIM_CANDIDATES = 10
+
+
+def _timeout():
+    return getattr(settings, "OCR_JOB_TIMEOUT", 30)
+
+
+def _max_attempts():
+    return getattr(settings, "OCR_MAX_ATTEMPTS", 3)
+
+
+def _batch_size():
+    return max(1, getattr(settings, "OCR_BATCH_SIZE", 8))
+
+
+def enqueue_ocr(stored_files):
+    """Queue a coordinate scan for each of stored_files (saved rows)"""
+    OcrJob.objects.bulk_create([OcrJob(stored_file=sf) for sf in stored_files], ignore_conflicts=True)
+
+
+def claim_jobs(limit=1, now=None):
+    """
+    Take up to limit runnable jobs (queued and due, or running with an
+    expired lease) and mark them running. Returns the claimed jobs.
+    """
+    now = now or timezone.now()
+    lease = timezone.timedelta(seconds=_timeout() * limit + LEASE_SLACK_SECONDS)
+
+    candidates = (
+        OcrJob.objects.filter(
+            Q(status=OcrJob.Status.QUEUED, run_after__lte=now)
+            | Q(status=OcrJob.Status.RUNNING, locked_until__lt=now)
+        )
+        .order_by("run_after")
+        .values_list("pk", "status", "attempts")[:max(CLAIM_CANDIDATES, limit * 2)]
+    )
+
+    claimed = []
+    for pk, status, attempts in candidates:
+        job = OcrJob.objects.filter(pk=pk, status=status, attempts=attempts)
+        if attempts >= _max_attempts():
+            # Lost by a worker on its last attempt
+            job.update(status=OcrJob.Status.FAILED, locked_until=None, last_error="Timed out")
+            continue
+        # Whoever changes (status, attempts) first owns the job
+        if job.update(status=OcrJob.Status.RUNNING, attempts=attempts + 1, locked_until=now + lease):
+            claimed.append(pk)
+            if len(claimed) == limit:
+                break
+
+    jobs = OcrJob.objects.select_related("stored_file__section").in_bulk(claimed)
+    return [jobs[pk] for pk in claimed]
+
+
+def _fail(job, mine, exc):
+    logger.warning("OCR job %s failed (attempt %s): %s", job.pk, job.attempts, exc)
+    if job.attempts >= _max_attempts():
+        mine.update(status=OcrJob.Status.FAILED, locked_until=None, last_error=str(exc)[:1000])
+    else:
+        delay = getattr(settings, "OCR_RETRY_DELAY", 30) * 2 ** (job.attempts - 1)
+        mine.update(
+            status=OcrJob.Status.QUEUED,
+            locked_until=None,
+            run_after=timezone.now() + timezone.timedelta(seconds=delay),
+            last_error=str(exc)[:1000],
+        )
+
+
+def run_jobs(jobs):
+    """Scan the jobs' images in one batch and store the results (or schedule retries)"""
+    if not jobs:
+        return
+
+    try:
+        results = scan_coordinates_batch([job.stored_file.file.path for job in jobs], timeout=_timeout())
+    except Exception as exc:
+        # The engine failed as a whole; every job of the batch gets retried
+        logger.warning("OCR batch of %s jobs failed", len(jobs), exc_info=True)
+        results = [exc] * len(jobs)
+
+    slugs = set()
+    for job, result in zip(jobs, results):
+        mine = OcrJob.objects.filter(pk=job.pk, status=OcrJob.Status.RUNNING, attempts=job.attempts)
+        if isinstance(result, Exception):
+            _fail(job, mine, result)
+            continue
+
+        with transaction.atomic():
+            # The lease may have run out and the job gone to another worker
+            if not mine.update(status=OcrJob.Status.DONE, locked_until=None, last_error=""):
+                continue
+            StoredFile.objects.filter(pk=job.stored_file.pk).update(coordinates=result or None)
+        slugs.add(job.stored_file.section.slug)
+
+    for slug in slugs:
+        invalidate_section(slug)
+
+
+def run_worker(stop_event, poll_interval=None, once=False, batch_size=None):
+    """
+    Claim and run batches of jobs until stop_event is set (or, with once,
+    until the queue has nothing runnable).
+    """
+    if poll_interval is None:
+        poll_interval = getattr(settings, "OCR_POLL_INTERVAL", 2)
+    batch_size = batch_size or _batch_size()
+
+    try:
+        while not stop_event.is_set():
+            close_old_connections()
+            jobs = claim_jobs(batch_size)
+            if not jobs:
+                if once:
+                    break
+                stop_event.wait(poll_interval)
+                continue
+            run_jobs(jobs)
+    finally:
+        connection.close()
+
+
+def run_worker_pool(workers, poll_interval=None, once=False, stop_event=None, batch_size=None):
+    """Run `workers` worker threads; returns when all of them have stopped"""
+    stop_event = stop_event or threading.Event()
+    threads = [
+        threading.Thread(
+            target=run_worker,
+            args=(stop_event, poll_interval, once, batch_size),
+            name=f"ocr-worker-{i}",
+            daemon=True,
+        )
+        for i in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(timeout=1)
+    except KeyboardInterrupt:
+        stop_event.set()
+        for thread in threads:
+            thread.join()
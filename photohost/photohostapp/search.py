@@ -0,0 +1,205 @@
+"""
+Search index for the dashboard's file and section lookup.
+
+SQLite: two FTS5 tables with the trigram tokenizer, so any substring of
+three or more characters is an index lookup (case-insensitive), ranked by
+bm25. The rowid is the StoredFile / Section id:
+
+    photohostapp_file_search(name, slug)
+    photohostapp_section_search(slug, title)
+
+PostgreSQL: pg_trgm GIN indexes on the same columns turn ILIKE '%q%' into
+an index lookup; hits are ranked by trigram similarity.
+
+Sections are indexed by the post_save / post_delete receivers in
+signals.py. Files are indexed by save_section_files() (bulk_create sends
+no post_save) and removed on post_delete. Terms shorter than three
+characters can't use a trigram index; the filter helpers return None for
+them so callers can fall back to prefix matching.
+"""
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from .models import Section, StoredFile
+
+FILE_TABLE = "photohostapp_file_search"
+SECTION_TABLE = "photohostapp_section_search"
+
+MIN_TERM_LENGTH = 3
+
+
+def _vendor():
+    return connection.vendor
+
+
+def _terms(q):
+    return [term for term in q.split() if len(term) >= MIN_TERM_LENGTH]
+
+
+def _match_expression(q):
+    """FTS5 query: every term as a quoted substring, all required; None if nothing is searchable"""
+    terms = _terms(q)
+    if not terms:
+        return None
+    return " AND ".join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+# --- index maintenance -------------------------------------------------------
+
+def index_files(stored_files):
+    """Add saved StoredFile rows (with their section loaded) to the index"""
+    if _vendor() != "sqlite" or not stored_files:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT OR REPLACE INTO {FILE_TABLE} (rowid, name, slug) VALUES (%s, %s, %s)",
+            [(sf.pk, sf.original_name, sf.section.slug) for sf in stored_files],
+        )
+
+
+def unindex_file(file_id):
+    if _vendor() != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FILE_TABLE} WHERE rowid = %s", [file_id])
+
+
+def index_section(section):
+    if _vendor() != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT OR REPLACE INTO {SECTION_TABLE} (rowid, slug, title) VALUES (%s, %s, %s)",
+            [section.pk, section.slug, section.title],
+        )
+
+
+def unindex_section(section_id):
+    if _vendor() != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SECTION_TABLE} WHERE rowid = %s", [section_id])
+
+
+# --- filters for the dashboard lists ----------------------------------------
+
+def file_filter(q):
+    """Q restricting StoredFile to matches of q, or None if q has no searchable term"""
+    if _vendor() == "sqlite":
+        match = _match_expression(q)
+        if match is None:
+            return None
+        return Q(id__in=RawSQL(f"SELECT rowid FROM {FILE_TABLE} WHERE {FILE_TABLE} MATCH %s", [match]))
+
+    terms = _terms(q)
+    if not terms:
+        return None
+    condition = Q()
+    for term in terms:
+        condition &= Q(original_name__icontains=term) | Q(section__slug__icontains=term)
+    return condition
+
+
+def section_filter(q):
+    """Q restricting Section to matches of q, or None if q has no searchable term"""
+    if _vendor() == "sqlite":
+        match = _match_expression(q)
+        if match is None:
+            return None
+        return Q(id__in=RawSQL(f"SELECT rowid FROM {SECTION_TABLE} WHERE {SECTION_TABLE} MATCH %s", [match]))
+
+    terms = _terms(q)
+    if not terms:
+        return None
+    condition = Q()
+    for term in terms:
+        condition &= Q(slug__icontains=term) | Q(title__icontains=term)
+    return condition
+
+
+# --- ranked search -----------------------------------------------------------
+
+def _ranked_ids(table, match, live_sql, now, limit, offset):
+    params = [match, connection.ops.adapt_datetimefield_value(now), limit, offset]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT {table}.rowid FROM {table} {live_sql} "
+            f"WHERE {table} MATCH %s AND s.expires_at > %s "
+            f"ORDER BY {table}.rank LIMIT %s OFFSET %s",
+            params,
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _in_order(qs, ids):
+    objects = qs.in_bulk(ids)
+    return [objects[pk] for pk in ids if pk in objects]
+
+
+def _similarity(*fields, q):
+    from django.contrib.postgres.search import TrigramWordSimilarity
+    return Greatest(*(TrigramWordSimilarity(q, field) for field in fields))
+
+
+def search_files(q, limit=20, offset=0, now=None):
+    """
+    Best matches first among files of live sections: (files, has_more).
+    limit + 1 rows are fetched to tell whether there is another page.
+    """
+    now = now or timezone.now()
+    live = StoredFile.objects.select_related("section").filter(section__expires_at__gt=now)
+
+    if _vendor() == "sqlite":
+        match = _match_expression(q)
+        if match is None:
+            return [], False
+        ids = _ranked_ids(
+            FILE_TABLE, match,
+            f"JOIN photohostapp_storedfile f ON f.id = {FILE_TABLE}.rowid "
+            "JOIN photohostapp_section s ON s.id = f.section_id",
+            now, limit + 1, offset,
+        )
+        hits = _in_order(live, ids)
+    else:
+        condition = file_filter(q)
+        if condition is None:
+            return [], False
+        hits = live.filter(condition)
+        if _vendor() == "postgresql":
+            hits = hits.annotate(score=_similarity("original_name", "section__slug", q=q)).order_by("-score", "-uploaded_at")
+        else:
+            hits = hits.order_by("-uploaded_at")
+        hits = list(hits[offset:offset + limit + 1])
+
+    return hits[:limit], len(hits) > limit
+
+
+def search_sections(q, limit=20, offset=0, now=None):
+    """Best matches first among live sections: (sections, has_more)"""
+    now = now or timezone.now()
+    live = Section.objects.filter(expires_at__gt=now)
+
+    if _vendor() == "sqlite":
+        match = _match_expression(q)
+        if match is None:
+            return [], False
+        ids = _ranked_ids(
+            SECTION_TABLE, match,
+            f"JOIN photohostapp_section s ON s.id = {SECTION_TABLE}.rowid",
+            now, limit + 1, offset,
+        )
+        hits = _in_order(live, ids)
+    else:
+        condition = section_filter(q)
+        if condition is None:
+            return [], False
+        hits = live.filter(condition)
+        if _vendor() == "postgresql":
+            hits = hits.annotate(score=_similarity("slug", "title", q=q)).order_by("-score", "-created_at")
+        else:
+            hits = hits.order_by("-created_at")
+        hits = list(hits[offset:offset + limit + 1])
+
+    return hits[:limit], len(hits) > limit
@@ -0,0 +1,33 @@
+"""
+Cache of the rendered file grids of section_detail.
+
+A section's files never change after upload, so the expensive part of the
+page (one card per file, text previews) is rendered once per language and
+kept until the section expires, at most SECTION_CACHE_TIMEOUT seconds.
+Deleting a file or the section drops the entries (see signals.py).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+
+def section_cache_key(slug, language):
+    return f"section_detail:{slug}:{language}"
+
+
+def get_cached_section(slug, language):
+    """{"section": Section, "files_html": str} or None"""
+    return cache.get(section_cache_key(slug, language))
+
+
+def cache_section(section, language, files_html):
+    entry = {"section": section, "files_html": files_html}
+    remaining = int((section.expires_at - timezone.now()).total_seconds())
+    timeout = min(remaining, getattr(settings, "SECTION_CACHE_TIMEOUT", 3600))
+    if timeout > 0:
+        cache.set(section_cache_key(section.slug, language), entry, timeout)
+    return entry
+
+
+def invalidate_section(slug):
+    cache.delete_many([section_cache_key(slug, code) for code, _ in settings.LANGUAGES])
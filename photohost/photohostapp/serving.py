@@ -0,0 +1,229 @@
+"""
+Responses for the views that hand out stored files.
+
+The views do their checks (slug, expiry, ...) and then call serve_file();
+FILE_SERVING_BACKEND decides who actually moves the bytes:
+
+  "django"    streamed by the worker (default, dev server)
+  "nginx"     X-Accel-Redirect to FILE_SERVING_INTERNAL_URL + the path
+              below MEDIA_ROOT, e.g.
+                  location /protected/ { internal; alias /srv/photohost/media/; }
+  "sendfile"  X-Sendfile with the absolute path (Apache mod_xsendfile, lighttpd)
+
+With an accelerated backend the worker is free as soon as the headers are
+written, however slowly the client reads.
+
+Every response carries ETag, Last-Modified and a Cache-Control lifetime
+that ends when the section expires; If-None-Match / If-Modified-Since are
+answered with 304 before any file is opened. The "django" backend also
+serves single and multiple byte ranges (206); the accelerated backends
+leave ranges to the front server.
+"""
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.crypto import get_random_string
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+from urllib.parse import quote
+import mimetypes
+import os
+
+BACKENDS = ("django", "nginx", "sendfile")
+
+FILE_CHUNK_SIZE = 64 * 1024
+
+# More ranges than this in one request are ignored and the whole file is sent
+MAX_RANGES = 16
+
+
+def _backend():
+    backend = getattr(settings, "FILE_SERVING_BACKEND", "django") or "django"
+    if backend not in BACKENDS:
+        raise ImproperlyConfigured(f"FILE_SERVING_BACKEND must be one of {', '.join(BACKENDS)}, not {backend!r}")
+    return backend
+
+
+def _internal_url(path):
+    media_root = os.path.realpath(settings.MEDIA_ROOT)
+    relative = os.path.relpath(os.path.realpath(path), media_root)
+    if relative.startswith(os.pardir):
+        raise ValueError(f"{path} is outside MEDIA_ROOT")
+    prefix = getattr(settings, "FILE_SERVING_INTERNAL_URL", "/protected/").rstrip("/")
+    return f"{prefix}/{quote(relative.replace(os.sep, '/'))}"
+
+
+def parse_range_header(header, size):
+    """
+    Parse a "bytes=..." Range header against a file of size bytes.
+
+    Returns a list of inclusive (start, end) pairs, an empty list when no
+    range is satisfiable (-> 416), or None when the header should be
+    ignored (absent, malformed, not bytes, too many ranges).
+    """
+    if not header or size <= 0:
+        return None
+    unit, _, specs = header.partition("=")
+    if unit.strip().lower() != "bytes":
+        return None
+
+    ranges = []
+    for spec in specs.split(","):
+        first, sep, last = spec.strip().partition("-")
+        if not sep or not (first or last) or not all(part.isdigit() for part in (first, last) if part):
+            return None
+
+        if not first:
+            # suffix range: the last N bytes
+            length = int(last)
+            if length == 0:
+                continue
+            start, end = max(size - length, 0), size - 1
+        else:
+            start = int(first)
+            end = int(last) if last else size - 1
+            if end < start and last:
+                return None
+            if start >= size:
+                continue
+            end = min(end, size - 1)
+        ranges.append((start, end))
+
+    if len(ranges) > MAX_RANGES:
+        return None
+    return ranges
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.headers.get("If-Range")
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/"')):
+        # Only a strong comparison may resume a download
+        return not if_range.startswith("W/") and if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def _iter_range(path, start, end, chunk_size=FILE_CHUNK_SIZE):
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = fh.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _iter_multipart(path, parts, boundary):
+    for head, (start, end) in parts:
+        yield head
+        yield from _iter_range(path, start, end)
+    yield f"\r\n--{boundary}--\r\n".encode()
+
+
+def _range_response(path, ranges, size, content_type):
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        response = StreamingHttpResponse(_iter_range(path, start, end), status=206, content_type=content_type)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(end - start + 1)
+        return response
+
+    boundary = get_random_string(32)
+    parts = []
+    length = 0
+    for start, end in ranges:
+        head = (
+            f"\r\n--{boundary}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+        ).encode()
+        parts.append((head, (start, end)))
+        length += len(head) + end - start + 1
+    length += len(f"\r\n--{boundary}--\r\n")
+
+    response = StreamingHttpResponse(
+        _iter_multipart(path, parts, boundary),
+        status=206,
+        content_type=f"multipart/byteranges; boundary={boundary}",
+    )
+    response["Content-Length"] = str(length)
+    return response
+
+
+def _set_validators(response, etag, last_modified, expires_at, public):
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    if expires_at is not None:
+        # Never let a cache keep the file past the section's expiry
+        max_age = max(0, int((expires_at - timezone.now()).total_seconds()))
+        patch_cache_control(response, max_age=max_age, **({"public": True} if public else {"private": True}))
+        response["Expires"] = http_date(expires_at.timestamp())
+
+
+def serve_file(request, path, content_type=None, as_attachment=False, filename=None,
+               etag=None, expires_at=None, public=True):
+    """
+    Return a response for the file at path (below MEDIA_ROOT).
+
+    filename is what the client sees in Content-Disposition (default: the
+    basename of path). etag defaults to mtime+size; pass a quoted content
+    hash when there is one. expires_at bounds the Cache-Control lifetime;
+    public=False keeps shared caches out.
+    """
+    stat = os.stat(path)
+    last_modified = int(stat.st_mtime)
+    etag = etag or f'"{last_modified:x}-{stat.st_size:x}"'
+    filename = filename or os.path.basename(path)
+    if content_type is None:
+        content_type, _ = mimetypes.guess_type(filename)
+    content_type = content_type or "application/octet-stream"
+
+    validators = HttpResponse()
+    _set_validators(validators, etag, last_modified, expires_at, public)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified, response=validators)
+    if not_modified is not validators:
+        return not_modified
+
+    backend = _backend()
+    if backend != "django":
+        response = HttpResponse(content_type=content_type)
+        if backend == "nginx":
+            response["X-Accel-Redirect"] = _internal_url(path)
+        else:
+            response["X-Sendfile"] = os.path.realpath(path)
+    else:
+        ranges = None
+        if request.method in ("GET", "HEAD") and _if_range_matches(request, etag, last_modified):
+            ranges = parse_range_header(request.headers.get("Range"), stat.st_size)
+
+        if ranges == []:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{stat.st_size}"
+            return response
+        if ranges:
+            response = _range_response(path, ranges, stat.st_size, content_type)
+        else:
+            response = FileResponse(open(path, "rb"), content_type=content_type)
+        response["Accept-Ranges"] = "bytes"
+
+    response["Content-Disposition"] = content_disposition_header(as_attachment, filename)
+    _set_validators(response, etag, last_modified, expires_at, public)
+    return response
+
+
+def serve_stored_file(request, stored_file, as_attachment=False, content_type=None, public=True):
+    """serve_file() for a StoredFile, under its original name, cacheable until its section expires"""
+    return serve_file(
+        request,
+        stored_file.file.path,
+        content_type=content_type or stored_file.content_type or None,
+        as_attachment=as_attachment,
+        filename=stored_file.original_name or os.path.basename(stored_file.file.name),
+        etag=f'"{stored_file.content_hash}"' if stored_file.content_hash else None,
+        expires_at=stored_file.section.expires_at,
+        public=public,
+    )
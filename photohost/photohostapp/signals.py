@@ -1,28 +1,68 @@
-
-from django.db.models.signals import pre_save, post_save
-from django.dispatch import receiver
 from django.db import transaction
-from django.utils import timezone
-from .models import Section
-import logging
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Section, StoredFile
+from .thumbnails import delete_derivatives
+from .blobs import release_blob
+from .section_cache import invalidate_section
+from . import search
+from .usage import record_file_deleted
+
+
+@receiver(post_delete, sender=StoredFile)
+def delete_unused_derivatives(sender, instance, **kwargs):
+    """Drop cached thumbnails once no remaining file shares their content hash"""
+    content_hash = instance.content_hash
+    if not content_hash:
+        return
+
+    def _cleanup():
+        if not StoredFile.objects.filter(content_hash=content_hash).exists():
+            delete_derivatives(content_hash)
+
+    transaction.on_commit(_cleanup)
+
+
+@receiver(post_delete, sender=StoredFile)
+def release_stored_blob(sender, instance, **kwargs):
+    """django_cleanup removes the file's own link; the shared blob goes with its last reference"""
+    if instance.blob_id:
+        release_blob(instance.blob_id)
+
+
+@receiver(post_save, sender=Section)
+@receiver(post_delete, sender=Section)
+def invalidate_section_page(sender, instance, **kwargs):
+    invalidate_section(instance.slug)
+
+
+@receiver(post_delete, sender=StoredFile)
+def invalidate_section_page_for_file(sender, instance, origin=None, **kwargs):
+    # Cascades from a section delete are covered by the receiver above
+    if isinstance(origin, Section) or getattr(origin, "model", None) is Section:
+        return
+    slug = Section.objects.filter(pk=instance.section_id).values_list("slug", flat=True).first()
+    if slug:
+        invalidate_section(slug)
+
+
+@receiver(post_save, sender=Section)
+def index_section(sender, instance, **kwargs):
+    search.index_section(instance)
 
-logger = logging.getLogger(__name__)
 
+@receiver(post_delete, sender=Section)
+def unindex_section(sender, instance, **kwargs):
+    search.unindex_section(instance.pk)
 
-@receiver(pre_save, sender=Section)
-def cleanup_expired_on_save(sender, instance, **kwargs):
-    """Delete expired sections before saving new ones"""
-    # Run cleanup in the background
-    from django.db import connection
-    with connection.cursor() as cursor:
-        # Find and delete expired sections
-        expired_ids = []
-        for section in Section.objects.all():
-            if section.is_expired():
-                expired_ids.append(section.id)
 
-        if expired_ids:
-            Section.objects.filter(id__in=expired_ids).delete()
-            logger.info(f"Cleaned up {len(expired_ids)} expired sections")
+@receiver(post_delete, sender=StoredFile)
+def unindex_file(sender, instance, **kwargs):
+    # Files are indexed by save_section_files(); bulk_create sends no post_save
+    search.unindex_file(instance.pk)
 
 
+@receiver(post_delete, sender=StoredFile)
+def uncount_file(sender, instance, origin=None, **kwargs):
+    with_section = isinstance(origin, Section) or getattr(origin, "model", None) is Section
+    record_file_deleted(instance, with_section=with_section)
@@ -0,0 +1,98 @@
+import hashlib
+import os
+import tempfile
+from django.conf import settings
+from PIL import Image, ImageOps
+
+try:
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+except ImportError:
+    pass
+
+# name -> width in px; "thumb" fills the gallery grid, "medium" the srcset upper bound.
+# Renders are bounded by width (not the long edge) so the srcset "400w" / "1280w"
+# descriptors hold for portrait images too; the template repeats these numbers.
+THUMBNAIL_SIZES = {
+    "thumb": 400,
+    "medium": 1280,
+}
+# Very tall images are capped at this many widths of height (and come out narrower)
+THUMBNAIL_MAX_ASPECT = 3
+THUMBNAIL_FORMAT = "WEBP"
+THUMBNAIL_QUALITY = 80
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def file_sha256(field_file):
+    """SHA-256 of a stored file, read in chunks."""
+    h = hashlib.sha256()
+    field_file.open("rb")
+    try:
+        for chunk in iter(lambda: field_file.read(HASH_CHUNK_SIZE), b""):
+            h.update(chunk)
+    finally:
+        field_file.close()
+    return h.hexdigest()
+
+
+def derivative_dir():
+    return os.path.join(settings.MEDIA_ROOT, "derivatives")
+
+
+def derivative_path(content_hash, size_name):
+    """Derivatives are keyed by content hash, so identical uploads share them."""
+    width = THUMBNAIL_SIZES[size_name]
+    return os.path.join(derivative_dir(), content_hash[:2], f"{content_hash}_{size_name}_{width}w.webp")
+
+
+def ensure_content_hash(stored_file):
+    if not stored_file.content_hash:
+        stored_file.content_hash = file_sha256(stored_file.file)
+        type(stored_file).objects.filter(pk=stored_file.pk).update(content_hash=stored_file.content_hash)
+    return stored_file.content_hash
+
+
+def get_or_create_derivative(stored_file, size_name):
+    """
+    Return the path of the cached derivative, rendering it on first use.
+    Raises KeyError for an unknown size and OSError/ValueError if the
+    source cannot be decoded as an image.
+    """
+    max_width = THUMBNAIL_SIZES[size_name]
+    max_height = max_width * THUMBNAIL_MAX_ASPECT
+    path = derivative_path(ensure_content_hash(stored_file), size_name)
+    if os.path.exists(path):
+        return path
+
+    with stored_file.file.open("rb") as fh, Image.open(fh) as img:
+        # draft() lets the JPEG decoder downscale while decoding
+        # (bounded by the short side, as the EXIF rotation isn't applied yet)
+        img.draft("RGB", (max_width, max_width))
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((max_width, max_height))
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info or img.mode in ("LA", "PA") else "RGB")
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write-then-rename so concurrent requests never see a half-written file
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                img.save(out, format=THUMBNAIL_FORMAT, quality=THUMBNAIL_QUALITY, method=4)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    return path
+
+
+def delete_derivatives(content_hash):
+    for size_name in THUMBNAIL_SIZES:
+        try:
+            os.remove(derivative_path(content_hash, size_name))
+        except FileNotFoundError:
+            pass
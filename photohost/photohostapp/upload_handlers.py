@@ -0,0 +1,85 @@
+import hashlib
+import os
+import tempfile
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile, UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers, StopUpload
+
+# Room for the non-file form fields and multipart boundaries in Content-Length
+FORM_OVERHEAD_BYTES = 1024 * 1024
+
+
+def upload_temp_dir():
+    path = getattr(settings, "UPLOAD_TEMP_DIR", None) or os.path.join(settings.MEDIA_ROOT, "uploads_tmp")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class MediaTemporaryUploadedFile(TemporaryUploadedFile):
+    """TemporaryUploadedFile that lives in upload_temp_dir() (same filesystem as MEDIA_ROOT)."""
+    def __init__(self, name, content_type, size, charset, content_type_extra=None):
+        _, ext = os.path.splitext(name)
+        file = tempfile.NamedTemporaryFile(suffix=".upload" + ext, dir=upload_temp_dir())
+        UploadedFile.__init__(self, file, name, content_type, size, charset, content_type_extra)
+
+
+class HashingTemporaryFileUploadHandler(FileUploadHandler):
+    """
+    Streams every uploaded file straight to a temp file next to MEDIA_ROOT
+    (so storage can later rename it into place instead of copying) while:
+      - computing its SHA-256 (exposed as uploaded_file.content_hash),
+      - enforcing a cap on the total size of all files in the request.
+
+    When the cap is exceeded the upload is stopped without reading the rest
+    of the body and request.upload_too_large is set for the view to report.
+    """
+    def __init__(self, request=None, max_total_size=None):
+        super().__init__(request)
+        self.max_total_size = max_total_size
+        self.total_size = 0
+        self.too_large = False
+
+    def _reject(self):
+        self.too_large = True
+        if self.request is not None:
+            self.request.upload_too_large = True
+        raise StopUpload(connection_reset=True)
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # Obviously too big: refuse at the first file instead of streaming it to disk
+        if self.max_total_size is not None and content_length > self.max_total_size + FORM_OVERHEAD_BYTES:
+            self.too_large = True
+        return None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        if self.too_large:
+            self._reject()
+
+        self.hasher = hashlib.sha256()
+        self.file = MediaTemporaryUploadedFile(
+            self.file_name, self.content_type, 0, self.charset, self.content_type_extra
+        )
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.total_size += len(raw_data)
+        if self.max_total_size is not None and self.total_size > self.max_total_size:
+            self._reject()
+        self.hasher.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.content_hash = self.hasher.hexdigest()
+        return self.file
+
+    def upload_interrupted(self):
+        if hasattr(self, "file"):
+            temp_location = self.file.temporary_file_path()
+            try:
+                self.file.close()
+                os.remove(temp_location)
+            except FileNotFoundError:
+                pass
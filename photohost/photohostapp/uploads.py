@@ -0,0 +1,88 @@
+import os
+from django.db import transaction
+from .models import StoredFile
+from .filetypes import read_text_preview, sniff
+from .ocr_queue import enqueue_ocr
+from .search import index_files
+from .usage import record_upload
+from .blobs import adopt_as_blob, attach_blobs, blob_name, content_sha256, link_existing_blob
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def save_section_files(section, files):
+    """
+    Persist an album upload.
+
+    files is an iterable of (upload_name, content) pairs. Every file is
+    written to storage first (upload_to() still decides UUID vs original
+    name), then the section and all StoredFile rows are inserted in ONE
+    transaction with a single bulk_create. If anything fails, the files
+    already written are removed again and the exception is re-raised.
+
+    The type, size, image dimensions and a bounded text preview are taken
+    from the content on the way (filetypes.py).
+
+    Content that is already stored is not written again: the new file is
+    hard linked to the existing blob (see blobs.py). The storage counters
+    are updated in the same transaction (usage.py).
+
+    The section may be unsaved; it gets its slug up front so upload paths
+    can be built before it exists in the DB.
+    """
+    section.assign_slug()
+
+    stored = []
+    linked = []
+    new_blobs = []
+    written = 0
+    try:
+        for upload_name, content in files:
+            sf = StoredFile(section=section)
+            try:
+                sf.content_hash = getattr(content, "content_hash", "") or content_sha256(content)
+                for field, value in sniff(content, upload_name).items():
+                    setattr(sf, field, value)
+                sf.size_bytes = content.size
+                if sf.kind == StoredFile.Kind.TEXT:
+                    sf.text_preview, sf.text_truncated = read_text_preview(content)
+                if link_existing_blob(sf, upload_name):
+                    stored.append(sf)  # in storage now, so removed again if anything fails
+                    linked.append(sf)
+                else:
+                    sf.file.save(upload_name, content, save=False)
+                    stored.append(sf)
+                    written += sf.size_bytes
+                    if adopt_as_blob(sf):
+                        new_blobs.append(blob_name(sf.content_hash))
+                        linked.append(sf)
+            finally:
+                # Temp files may have been renamed into storage; close them now, not at GC
+                content.close()
+
+            if section.keep_original_filenames:
+                sf.original_name = os.path.basename(upload_name)  # keep original
+            else:
+                sf.original_name = os.path.basename(sf.file.name)  # store UUID name
+
+        with transaction.atomic():
+            section.bytes_used += sum(sf.size_bytes for sf in stored)
+            section.save()
+            for sf in stored:
+                sf.section = section  # pick up the pk assigned by save()
+            written += sum(sf.size_bytes for sf in attach_blobs(linked))
+            StoredFile.objects.bulk_create(stored)
+            index_files(stored)
+            record_upload(stored, written)
+            if section.scan_coordinates:
+                enqueue_ocr([sf for sf in stored if sf.kind == StoredFile.Kind.IMAGE])
+    except BaseException:
+        for name in [sf.file.name for sf in stored] + new_blobs:
+            try:
+                StoredFile._meta.get_field("file").storage.delete(name)
+            except Exception:
+                logger.warning("Could not remove %s after failed upload", name, exc_info=True)
+        raise
+
+    return stored
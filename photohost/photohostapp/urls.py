@@ -5,11 +5,19 @@ app_name = "photohostapp"
 
 urlpatterns = [
     path("", views.create_section_and_upload, name="create"),
+    path("upload/", views.chunked_upload_init, name="chunked_upload_init"),
+    path("upload/<uuid:upload_id>/files/", views.chunked_upload_add_file, name="chunked_upload_add_file"),
+    path("upload/<uuid:upload_id>/files/<int:file_id>/", views.chunked_upload_file, name="chunked_upload_file"),
+    path("upload/<uuid:upload_id>/finalize/", views.chunked_upload_finalize, name="chunked_upload_finalize"),
     path("s/<slug:slug>/", views.section_detail, name="section_detail"),
     path("s/<slug:slug>/download.zip", views.download_zip, name="download_zip"),
+    path("s/<slug:slug>/coordinates/", views.section_coordinates, name="section_coordinates"),
   #  path('upload_image/', views.upload_image_view, name='upload_image'),
   #   path( "file/<int:file_id>/download/", views.download_file,name="download_file"),
     path("<slug:slug>/file/<int:file_id>/download/", views.download_file, name="download_file"),
+    path("<slug:slug>/file/<int:file_id>/view/", views.view_file, name="view_file"),
+    path("<slug:slug>/file/<int:file_id>/text/", views.file_text, name="file_text"),
+    path("<slug:slug>/file/<int:file_id>/thumb/<str:size>/", views.file_thumbnail, name="file_thumbnail"),
 
 
 ]
@@ -0,0 +1,207 @@
+"""
+Storage accounting for uploads.
+
+Two sets of counters, both kept in the database and updated in the same
+transaction as the rows they describe:
+
+  Section.bytes_used  total size of the section's files
+  MediaUsage          bytes really on disk under sections/ and blobs/ (a
+                      shared blob counts once, when it is created and when
+                      its last reference goes) and the number of files
+
+so capacity and per-section usage are one row away instead of a walk of
+MEDIA_ROOT. reconcile() walks the tree in parallel and corrects any drift
+(files removed by hand, crashes between commit and unlink, ...).
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from django.conf import settings
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from .models import MediaUsage, Section, StoredFile
+import os
+import threading
+
+USAGE_PK = 1
+
+RECONCILE_BATCH_SIZE = 500
+
+# Inside bulk_section_delete(): section_ids whose files uncount_section_files()
+# already took off, and blob bytes freed but not yet taken off
+_bulk = threading.local()
+
+
+def _add(bytes_delta=0, files_delta=0):
+    changes = {"bytes": F("bytes") + bytes_delta, "files": F("files") + files_delta, "updated_at": timezone.now()}
+    if not MediaUsage.objects.filter(pk=USAGE_PK).update(**changes):
+        MediaUsage.objects.get_or_create(pk=USAGE_PK)
+        MediaUsage.objects.filter(pk=USAGE_PK).update(**changes)
+
+
+def current_usage():
+    """The MediaUsage row (created empty if it doesn't exist yet)"""
+    usage, _ = MediaUsage.objects.get_or_create(pk=USAGE_PK)
+    return usage
+
+
+def media_bytes():
+    """Bytes on disk per the counter, or None before it exists; read-only"""
+    return MediaUsage.objects.filter(pk=USAGE_PK).values_list("bytes", flat=True).first()
+
+
+def record_upload(stored_files, new_bytes):
+    """
+    Count an upload; call in the transaction inserting stored_files.
+    new_bytes is what was actually written (files linked to an existing
+    blob add nothing on disk). The section's bytes_used is set by the
+    caller before it is saved.
+    """
+    _add(bytes_delta=new_bytes, files_delta=len(stored_files))
+
+
+def record_file_deleted(stored_file, with_section=False):
+    """
+    Uncount a deleted StoredFile. Its bytes leave the disk now unless it is
+    a link to a shared blob (see record_blob_deleted). The section counter
+    is skipped when the section is being deleted with it.
+    """
+    if stored_file.section_id in getattr(_bulk, "section_ids", ()):
+        return
+    size = stored_file.size_bytes
+    _add(bytes_delta=0 if stored_file.blob_id else -size, files_delta=-1)
+    if not with_section and size:
+        Section.objects.filter(pk=stored_file.section_id).update(bytes_used=Greatest(F("bytes_used") - size, 0))
+
+
+def record_blob_deleted(size):
+    if hasattr(_bulk, "freed"):
+        _bulk.freed += size
+        return
+    _add(bytes_delta=-size)
+
+
+@contextmanager
+def bulk_section_delete():
+    """
+    Scope of a bulk section delete (the expiry sweep): inside it,
+    uncount_section_files() replaces the per-file counter updates of the
+    post_delete receiver, and freed blobs are taken off in one update by
+    flush_bulk_deletes() (at the latest on leaving the scope) instead of one
+    per blob.
+    """
+    _bulk.section_ids = set()
+    _bulk.freed = 0
+    try:
+        yield
+    finally:
+        try:
+            flush_bulk_deletes()
+        finally:
+            del _bulk.section_ids, _bulk.freed
+
+
+def flush_bulk_deletes():
+    """Take the blob bytes freed so far in bulk_section_delete() off the counter"""
+    freed, _bulk.freed = getattr(_bulk, "freed", 0), 0
+    if freed:
+        _add(bytes_delta=-freed)
+
+
+def uncount_section_files(section_ids):
+    """
+    Uncount every file of the sections about to be deleted with one UPDATE
+    of the usage row instead of one per file; call in the deleting
+    transaction, inside bulk_section_delete(). Blob bytes still go with
+    record_blob_deleted() once the last reference is gone.
+    """
+    if not hasattr(_bulk, "section_ids"):
+        raise RuntimeError("uncount_section_files() called outside bulk_section_delete()")
+    totals = StoredFile.objects.filter(section_id__in=section_ids).aggregate(
+        files=Count("id"), private=Sum("size_bytes", filter=Q(blob=None))
+    )
+    if totals["files"]:
+        _add(bytes_delta=-(totals["private"] or 0), files_delta=-totals["files"])
+    _bulk.section_ids = set(section_ids)
+
+
+def scan_tree(path):
+    """
+    (bytes, private_bytes, files) of the regular files under path;
+    private_bytes leaves out files with more than one link, i.e. the
+    section copies of shared blobs, which are counted under blobs/.
+    """
+    total = private = files = 0
+    stack = [path]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        st = entry.stat(follow_symlinks=False)
+                        files += 1
+                        total += st.st_size
+                        if st.st_nlink == 1:
+                            private += st.st_size
+                except OSError:
+                    continue
+    return total, private, files
+
+
+def _subdirs(path):
+    try:
+        with os.scandir(path) as entries:
+            return [entry for entry in entries if entry.is_dir(follow_symlinks=False)]
+    except FileNotFoundError:
+        return []
+
+
+def reconcile(workers=8, dry_run=False):
+    """
+    Recount sections/ and blobs/ from the disk (one directory per task on
+    `workers` threads) and overwrite the counters that drifted. Uploads or
+    deletes running meanwhile can leave a small drift of their own; run it
+    again or when it's quiet.
+
+    Returns {"sections": checked, "sections_fixed": n, "bytes": (old, new), "files": (old, new)}.
+    """
+    root = settings.MEDIA_ROOT
+    section_dirs = _subdirs(os.path.join(root, "sections"))
+    blob_dirs = _subdirs(os.path.join(root, "blobs"))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        sections = dict(zip((entry.name for entry in section_dirs), pool.map(scan_tree, [entry.path for entry in section_dirs])))
+        blobs = list(pool.map(scan_tree, [entry.path for entry in blob_dirs]))
+
+    checked = 0
+    fixed = []
+    for section in Section.objects.only("id", "slug", "bytes_used").iterator(chunk_size=RECONCILE_BATCH_SIZE):
+        checked += 1
+        # What the section stores, shared blobs included
+        actual = sections.get(section.slug, (0, 0, 0))[0]
+        if section.bytes_used != actual:
+            section.bytes_used = actual
+            fixed.append(section)
+
+    total_bytes = sum(private for _, private, _ in sections.values()) + sum(total for total, _, _ in blobs)
+    total_files = sum(files for _, _, files in sections.values())
+
+    usage = current_usage()
+    report = {
+        "sections": checked,
+        "sections_fixed": len(fixed),
+        "bytes": (usage.bytes, total_bytes),
+        "files": (usage.files, total_files),
+    }
+    if not dry_run:
+        Section.objects.bulk_update(fixed, ["bytes_used"], batch_size=RECONCILE_BATCH_SIZE)
+        MediaUsage.objects.filter(pk=USAGE_PK).update(
+            bytes=total_bytes, files=total_files, updated_at=timezone.now(), reconciled_at=timezone.now()
+        )
+    return report
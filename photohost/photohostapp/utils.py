@@ -42,35 +42,155 @@
 #         return (uploaded_file.name, ContentFile(uploaded_file.read(), name=uploaded_file.name))
 
 
+import hashlib
+import logging
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from io import BytesIO
+from django.conf import settings
 from django.core.files.base import ContentFile, File
 from PIL import Image
+from .metadata import MetadataError, detect_format, strip_metadata
+from .upload_handlers import MediaTemporaryUploadedFile
+
+logger = logging.getLogger(__name__)
+
+
+# Pillow format each stripped format is re-encoded to when the segment walker
+# fails; HEIF only decodes with a plugin and is re-saved as JPEG.
+REENCODE_FORMATS = {"jpeg": "JPEG", "png": "PNG", "webp": "WEBP", "heif": "JPEG"}
+
+
+def _reencode_image(uploaded_file, name, fmt):
+    # Old path: decode to pixels and re-save without metadata (kept as fallback)
+    uploaded_file.seek(0)
+    try:
+        img = Image.open(uploaded_file)
+        img.load()
+    except Exception as e:
+        raise MetadataError(f"Can't decode {name!r} to strip its metadata: {e}") from e
+
+    target = REENCODE_FORMATS[fmt]
+    bio = BytesIO()
+    if target == "JPEG":
+        img.convert("RGB").save(bio, format="JPEG", quality=90, optimize=True)
+    elif target == "WEBP":
+        img.convert("RGBA" if "A" in img.getbands() else "RGB").save(bio, format="WEBP", quality=90)
+    else:
+        img.save(bio, format=target, optimize=True)
+    bio.seek(0)
+    return (name, ContentFile(bio.read(), name=name))
+
+
+class _HashingWriter:
+    """Write-through wrapper that hashes what is written sequentially."""
+    def __init__(self, f):
+        self.f = f
+        self.hasher = hashlib.sha256()
+        self.sequential = True
+
+    def write(self, data):
+        if self.sequential:
+            self.hasher.update(data)
+        return self.f.write(data)
+
+    def seek(self, *args):
+        # Patching in place (HEIF) -> the running hash no longer matches
+        self.sequential = False
+        return self.f.seek(*args)
+
+    def tell(self):
+        return self.f.tell()
+
+
+def _as_file(uploaded_file):
+    # Keep UploadedFile objects as they are so FileSystemStorage can rename
+    # a temporary_file_path() into place instead of copying it.
+    return uploaded_file if isinstance(uploaded_file, File) else File(uploaded_file)
+
 
 def remove_exif_and_get_file(uploaded_file):
     """
-    Fast EXIF removal:
-    - Only strips EXIF for JPEG/JPG by re-saving pixels to JPEG (keeps JPEG output).
-    - For all other files, returns the original uploaded file WITHOUT reading it into memory.
+    Lossless metadata removal:
+    - JPEG, PNG, WebP and HEIC/HEIF are rewritten segment by segment (see
+      metadata.py) into a temp file next to MEDIA_ROOT: no decode, no
+      re-encode, bounded memory, and storage can move it into place.
+    - An image the segment walker can't parse falls back to a Pillow
+      re-encode; if Pillow can't decode it either, MetadataError is raised
+      rather than storing it with its metadata.
+    - Anything else is returned as-is, WITHOUT reading it into memory.
+
+    The returned content carries content_hash (SHA-256) when it is known
+    without re-reading the file.
     """
     name = uploaded_file.name or "upload"
-    ext = os.path.splitext(name)[1].lower()
 
-    # Only JPEG really needs EXIF stripping here
-    if ext in [".jpg", ".jpeg"]:
+    tmp = MediaTemporaryUploadedFile(name, getattr(uploaded_file, "content_type", None), 0, None)
+    writer = _HashingWriter(tmp.file)
+    try:
+        fmt = strip_metadata(uploaded_file, writer)
+    except MetadataError:
+        tmp.close()
         uploaded_file.seek(0)
-        img = Image.open(uploaded_file)
+        fmt = detect_format(uploaded_file.read(16))
+        logger.warning("Could not strip metadata from %r (%s), re-encoding", name, fmt)
+        return _reencode_image(uploaded_file, name, fmt)
 
-        # Ensure pixels are loaded, but avoid verify()+reopen cost
-        img = img.convert("RGB")
+    if fmt is None:
+        tmp.close()
+        uploaded_file.seek(0)
+        return (name, _as_file(uploaded_file))
 
-        bio = BytesIO()
-        # Saving without exif parameter strips metadata
-        img.save(bio, format="JPEG", quality=90, optimize=True)
-        bio.seek(0)
+    tmp.file.flush()
+    tmp.size = os.path.getsize(tmp.temporary_file_path())
+    if writer.sequential:
+        tmp.content_hash = writer.hasher.hexdigest()
+    tmp.seek(0)
+    return (name, tmp)
 
-        return (name, ContentFile(bio.read(), name=name))
 
-    # Non-JPEG: return original file as-is, no memory copy
-    uploaded_file.seek(0)
-    return (name, File(uploaded_file))
+def _strip_workers():
+    workers = getattr(settings, "EXIF_STRIP_WORKERS", None)
+    if workers is None:
+        workers = min(4, os.cpu_count() or 1)
+    return max(1, int(workers))
+
+
+def remove_exif_batch(uploaded_files, workers=None):
+    """
+    Run remove_exif_and_get_file over a whole upload batch.
+
+    Yields (name, content) in the same order as uploaded_files. Stripping
+    is mostly reading and writing files (see metadata.py), so a small thread
+    pool overlaps that I/O across files; each result is yielded as soon as
+    it and everything before it is done, so the caller can save while the
+    rest is still being processed. At most workers * 2 files are in flight or
+    waiting to be consumed, so a slow consumer doesn't pile up temp copies
+    of the whole batch. With one worker (or one file) this is just the
+    serial loop.
+    """
+    workers = _strip_workers() if workers is None else max(1, int(workers))
+    workers = min(workers, len(uploaded_files))
+
+    if workers <= 1:
+        for f in uploaded_files:
+            yield remove_exif_and_get_file(f)
+        return
+
+    files = iter(uploaded_files)
+    window = deque()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="exif-strip") as pool:
+        try:
+            for f in islice(files, workers * 2):
+                window.append(pool.submit(remove_exif_and_get_file, f))
+            while window:
+                result = window.popleft().result()
+                for f in islice(files, 1):
+                    window.append(pool.submit(remove_exif_and_get_file, f))
+                yield result
+        finally:
+            # Caller gave up (or a file failed): don't process the rest
+            for future in window:
+                future.cancel()
@@ -1,27 +1,69 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.http import HttpResponse, Http404, FileResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from .forms import SectionCreateForm, ImageUploadForm
-from .models import Section, StoredFile
-from .utils import remove_exif_and_get_file
+from .models import Section, StoredFile, ChunkedUpload, ChunkedUploadFile, OcrJob
+from .utils import remove_exif_batch
+from .metadata import MetadataError
+from .uploads import save_section_files
+from .upload_handlers import HashingTemporaryFileUploadHandler
+from .thumbnails import THUMBNAIL_SIZES, get_or_create_derivative
+from .serving import serve_file, serve_stored_file
+from .section_cache import cache_section, get_cached_section
 from django.contrib import messages
-import io
-import zipfile
+import zipstream
 import os
+import shutil
 import uuid
-import mimetypes
 
 from django.urls import reverse
+from django.template.loader import render_to_string
+from django.utils.translation import get_language
+from django.conf import settings
+from django.core.files import File
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from datetime import timedelta
+import logging
+
+logger = logging.getLogger(__name__)
 
 MAX_SECTION_SIZE_MB = 300
 MAX_SECTION_SIZE_BYTES = MAX_SECTION_SIZE_MB * 1024 * 1024
 
+# Read size for streamed ZIP entries; at most one chunk per file is held in memory
+ZIP_CHUNK_SIZE = 64 * 1024
+
+# Formats that are already compressed: deflating them again only burns CPU
+ZIP_STORED_EXTENSIONS = {
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic', '.heif', '.avif',
+    '.zip', '.rar', '.7z', '.gz', '.bz2', '.xz',
+    '.mp3', '.mp4', '.m4a', '.mov', '.webm', '.mkv', '.pdf', '.docx', '.xlsx',
+}
 
+
+@csrf_exempt
 @require_http_methods(["GET", "POST"])
 def create_section_and_upload(request):
+    # Upload handlers can only be swapped before request.POST is touched, so the
+    # CSRF check moves from the middleware to the inner view.
+    request.upload_handlers = [HashingTemporaryFileUploadHandler(request, max_total_size=MAX_SECTION_SIZE_BYTES)]
+    return _create_section_and_upload(request)
+
+
+@csrf_protect
+def _create_section_and_upload(request):
     if request.method == "POST":
         sform = SectionCreateForm(request.POST)
 
+        # Set by the upload handler, which stops reading the body as soon as the limit is crossed
+        if getattr(request, "upload_too_large", False):
+            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                return JsonResponse({'status': 'error', 'message': 'Total upload size must not exceed 300 MB.'}, status=400)
+            messages.error(request, "Total upload size must not exceed 300 MB.")
+            return redirect("photohostapp:create")
+
         if sform.is_valid():
             files = request.FILES.getlist("files")
 
@@ -38,24 +80,19 @@ def create_section_and_upload(request):
                 messages.error(request, "Total upload size must not exceed 300 MB.")
                 return redirect("photohostapp:create")
 
-            # Always create ONE section (album)
-            section = sform.save()
-
-            for f in files:
-                processed_name, content = remove_exif_and_get_file(f)
-
-                sf = StoredFile(section=section)
-
-                # Save using ORIGINAL filename input, so upload_to() can decide UUID vs original
-                sf.file.save(f.name, content, save=True)
-
-                # NOW decide what to store in DB for "original_name"
-                if section.keep_original_filenames:
-                    sf.original_name = os.path.basename(f.name)  # keep original
-                else:
-                    sf.original_name = os.path.basename(sf.file.name)  # store UUID name
-
-                sf.save(update_fields=["original_name"])
+            # Always create ONE section (album): files hit storage first, then one transaction for all rows
+            section = sform.save(commit=False)
+            try:
+                save_section_files(
+                    section,
+                    ((f.name, content) for f, (processed_name, content) in zip(files, remove_exif_batch(files))),
+                )
+            except MetadataError as e:
+                # An image whose metadata can't be removed is not stored at all
+                if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                    return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+                messages.error(request, str(e))
+                return redirect("photohostapp:create")
 
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
                 return JsonResponse({
@@ -81,78 +118,321 @@ def create_section_and_upload(request):
 
 
 def section_detail(request, slug):
-    try:
-        section = Section.objects.get(slug=slug)
-    except Section.DoesNotExist:
+    language = get_language()
+    entry = get_cached_section(slug, language)
+
+    if entry is None:
+        try:
+            section = Section.objects.get(slug=slug)
+        except Section.DoesNotExist:
+            return render(request, "404.html", status=404)
+
+        if section.is_expired():
+            return render(request, "404.html", status=404)
+
+        entry = cache_section(section, language, render_to_string(
+            "photohostapp/partials/section_files.html",
+            {"section": section, "files": _section_files(section)},
+        ))
+    elif entry["section"].is_expired():
         return render(request, "404.html", status=404)
 
-    if section.is_expired():
-        return render(request, "404.html", status=404)
+    return render(request, "photohostapp/section_detail.html", entry)
 
-    image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.tiff'}
 
-    files = []
-    for f in section.files.all():
-        name = getattr(f.file, 'name', '') or ''
-        ext = os.path.splitext(name)[1].lower()
-        mime, _ = mimetypes.guess_type(name)
+def section_coordinates(request, slug):
+    """OCR status of a section's images; polled by the gallery until nothing is pending"""
+    section = get_object_or_404(Section, slug=slug)
+    if section.is_expired():
+        raise Http404("Section expired")
 
-        f.is_image = (mime and mime.startswith('image/')) or ext in image_extensions
-        f.is_text = ext == '.txt'
-        f.text_preview = ""
+    rows = OcrJob.objects.filter(stored_file__section=section).values_list(
+        "stored_file_id", "status", "stored_file__coordinates"
+    )
+    files = [{'id': file_id, 'status': status, 'coordinates': coordinates or ''} for file_id, status, coordinates in rows]
+    pending = sum(f['status'] in (OcrJob.Status.QUEUED, OcrJob.Status.RUNNING) for f in files)
+    return JsonResponse({'pending': pending, 'files': files})
 
-        if f.is_text:
-            try:
-                with open(f.file.path, "r", encoding="utf-8", errors="ignore") as fh:
-                    f.text_preview = fh.read().strip()
-            except Exception:
-                pass
 
+def _section_files(section):
+    files = []
+    for f in section.files.all():
+        f.is_image = f.kind == StoredFile.Kind.IMAGE
+        f.is_text = f.kind == StoredFile.Kind.TEXT
         files.append(f)
 
-    return render(
-        request,
-        "photohostapp/section_detail.html",
-        {
-            "section": section,
-            "files": files
-        }
-    )
+    return files
 
 
+def _iter_file_chunks(field_file, chunk_size=ZIP_CHUNK_SIZE):
+    """
+    Yield the stored file in fixed-size chunks.
+    The file is opened lazily, when the ZIP stream reaches this entry.
+    """
+    field_file.open("rb")
+    try:
+        while True:
+            chunk = field_file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        field_file.close()
 
 
 def download_zip(request, slug):
     section = get_object_or_404(Section, slug=slug)
     if section.is_expired():
         raise Http404("Section expired")
-    files = section.files.all()
+    files = list(section.files.all())
     if not files:
         raise Http404("No files")
-    buffer = io.BytesIO()
-    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-        for f in files:
-            f.file.open("rb")
-            data = f.file.read()
-            f.file.close()
-            zf.writestr(f.original_name, data)
-    buffer.seek(0)
-    response = HttpResponse(buffer.getvalue(), content_type="application/zip")
+
+    zf = zipstream.ZipFile(mode="w", compression=zipstream.ZIP_DEFLATED, allowZip64=True)
+    for f in files:
+        ext = os.path.splitext(f.original_name or f.file.name)[1].lower()
+        compress_type = zipstream.ZIP_STORED if ext in ZIP_STORED_EXTENSIONS else zipstream.ZIP_DEFLATED
+        zf.write_iter(f.original_name, _iter_file_chunks(f.file), compress_type=compress_type)
+
+    # Bytes are produced while the client reads: nothing is buffered up front
+    response = StreamingHttpResponse(zf, content_type="application/zip")
     response["Content-Disposition"] = f'attachment; filename="{section.slug}.zip"'
     return response
 
+def _get_live_file(slug, file_id):
+    stored_file = get_object_or_404(StoredFile.objects.select_related("section"), id=file_id, section__slug=slug)
+    if stored_file.section.is_expired():
+        raise Http404("Section expired")
+    return stored_file
+
+
 def download_file(request, slug, file_id):
-    stored_file = get_object_or_404(StoredFile, id=file_id, section__slug=slug)
-    section = stored_file.section
+    stored_file = _get_live_file(slug, file_id)
+
+    try:
+        return serve_stored_file(request, stored_file, as_attachment=True)
+    except FileNotFoundError:
+        raise Http404("File missing")
+
+
+def view_file(request, slug, file_id):
+    """The original file inline (gallery links, thumbnail fallback)"""
+    stored_file = _get_live_file(slug, file_id)
+
+    try:
+        return serve_stored_file(request, stored_file)
+    except FileNotFoundError:
+        raise Http404("File missing")
 
-    if section.is_expired():
-        raise Http404("Section expired")
 
-    # FileResponse can stream without manually opening
-    return FileResponse(
-        stored_file.file.open("rb"),
-        as_attachment=True,
-        filename=stored_file.original_name,
+def file_text(request, slug, file_id):
+    """Full text of a text file, loaded by the preview modal when the stored preview is truncated"""
+    stored_file = _get_live_file(slug, file_id)
+    if stored_file.kind != StoredFile.Kind.TEXT:
+        raise Http404("Not a text file")
+
+    try:
+        return serve_stored_file(request, stored_file, content_type="text/plain; charset=utf-8")
+    except FileNotFoundError:
+        raise Http404("File missing")
+
+
+def file_thumbnail(request, slug, file_id, size):
+    if size not in THUMBNAIL_SIZES:
+        raise Http404("Unknown size")
+
+    stored_file = _get_live_file(slug, file_id)
+
+    try:
+        path = get_or_create_derivative(stored_file, size)
+    except Exception:
+        # Not decodable by Pillow (svg, broken file, ...) -> show the original
+        logger.warning("Thumbnail failed for StoredFile %s", stored_file.id, exc_info=True)
+        return redirect("photohostapp:view_file", slug=slug, file_id=file_id)
+
+    return serve_file(request, path, content_type="image/webp", expires_at=stored_file.section.expires_at)
+
+
+# ---- Resumable chunked upload --------------------------------------------
+#
+#   POST  upload/                                  -> {"upload_id", "files_url", "finalize_url"}  (the upload form's fields)
+#   POST  upload/<upload_id>/files/                -> {"file_id", "url", "offset"}  (name, size)
+#   GET   upload/<upload_id>/files/<file_id>/      -> {"offset", "size"}       resume point
+#   PATCH upload/<upload_id>/files/<file_id>/      -> {"offset", "size"}       raw chunk body, header Upload-Offset
+#   POST  upload/<upload_id>/finalize/             -> {"status", "redirect_url"}
+#
+# Chunks are streamed straight into a temp file; only acknowledged offsets are stored.
+# The upload page (main1.js) sends every file this way.
+
+CHUNK_READ_SIZE = 64 * 1024
+CHUNKED_UPLOAD_MAX_CHUNK = 16 * 1024 * 1024
+# A finalize that hasn't finished after this long is assumed dead and may be retried
+FINALIZE_CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def _json_error(message, status=400, **extra):
+    return JsonResponse({'status': 'error', 'message': message, **extra}, status=status)
+
+
+@require_http_methods(["POST"])
+def chunked_upload_init(request):
+    sform = SectionCreateForm(request.POST)
+    if not sform.is_valid():
+        return _json_error('Form validation failed.', errors=sform.errors)
+
+    upload = ChunkedUpload.objects.create(
+        title=sform.cleaned_data["title"],
+        lifetime_days=sform.cleaned_data["lifetime_days"],
+        keep_original_filenames=sform.cleaned_data["keep_original_filenames"],
+        scan_coordinates=sform.cleaned_data["scan_coordinates"],
     )
+    os.makedirs(upload.temp_dir, exist_ok=True)
+    return JsonResponse({
+        'status': 'success',
+        'upload_id': str(upload.id),
+        'files_url': reverse('photohostapp:chunked_upload_add_file', kwargs={'upload_id': upload.id}),
+        'finalize_url': reverse('photohostapp:chunked_upload_finalize', kwargs={'upload_id': upload.id}),
+    }, status=201)
 
 
+@require_http_methods(["POST"])
+def chunked_upload_add_file(request, upload_id):
+    upload = get_object_or_404(ChunkedUpload, id=upload_id, section__isnull=True)
+
+    name = os.path.basename((request.POST.get("name") or "").strip())
+    try:
+        size = int(request.POST.get("size", ""))
+    except ValueError:
+        size = -1
+    if not name or size < 0:
+        return _json_error('A file name and size are required.')
+
+    declared = upload.files.aggregate(total=Sum("size"), count=Count("id"))
+    if declared["count"] >= settings.DATA_UPLOAD_MAX_NUMBER_FILES:
+        return _json_error('Too many files.')
+    if (declared["total"] or 0) + size > MAX_SECTION_SIZE_BYTES:
+        return _json_error('Total upload size must not exceed 300 MB.', status=413)
+
+    part = ChunkedUploadFile.objects.create(upload=upload, name=name, size=size)
+    open(part.temp_path, "wb").close()
+    return JsonResponse({
+        'status': 'success',
+        'file_id': part.id,
+        'url': reverse('photohostapp:chunked_upload_file', kwargs={'upload_id': upload.id, 'file_id': part.id}),
+        'offset': 0,
+    }, status=201)
+
+
+@require_http_methods(["GET", "HEAD", "PATCH", "PUT"])
+def chunked_upload_file(request, upload_id, file_id):
+    part = get_object_or_404(
+        ChunkedUploadFile.objects.select_related("upload"),
+        id=file_id, upload_id=upload_id, upload__section__isnull=True,
+    )
+
+    if request.method in ("GET", "HEAD"):
+        return JsonResponse({'offset': part.offset, 'size': part.size})
+
+    try:
+        offset = int(request.headers.get("Upload-Offset", ""))
+        length = int(request.headers.get("Content-Length") or 0)
+    except ValueError:
+        return _json_error('Upload-Offset and Content-Length headers are required.')
+
+    if offset != part.offset:
+        # Client is out of sync: tell it where to resume from
+        return _json_error('Offset mismatch.', status=409, offset=part.offset)
+    if length > CHUNKED_UPLOAD_MAX_CHUNK or offset + length > part.size:
+        return _json_error('Chunk too large.', status=413, offset=part.offset)
+
+    written = 0
+    with open(part.temp_path, "r+b") as fh:
+        fh.seek(offset)
+        while written < length:
+            data = request.read(min(CHUNK_READ_SIZE, length - written))
+            if not data:
+                break
+            fh.write(data)
+            written += len(data)
+        fh.truncate(offset + written)
+
+    # Only acknowledge bytes that actually arrived; the conditional update
+    # guards against two requests racing for the same offset.
+    updated = ChunkedUploadFile.objects.filter(id=part.id, offset=offset).update(offset=offset + written)
+    if not updated:
+        part.refresh_from_db(fields=["offset"])
+        return _json_error('Offset mismatch.', status=409, offset=part.offset)
+
+    return JsonResponse({'offset': offset + written, 'size': part.size})
+
+
+def _finalized(section, status=200):
+    return JsonResponse({
+        'status': 'success',
+        'message': 'Files uploaded successfully.',
+        'redirect_url': reverse('photohostapp:section_detail', kwargs={'slug': section.slug}),
+    }, status=status)
+
+
+@require_http_methods(["POST"])
+def chunked_upload_finalize(request, upload_id):
+    upload = get_object_or_404(ChunkedUpload.objects.select_related("section"), id=upload_id)
+
+    if upload.section_id:
+        # Already finalized (e.g. the client retried after a dropped response)
+        return _finalized(upload.section)
+
+    parts = list(upload.files.order_by("id"))
+    if not parts:
+        return _json_error('No files selected.')
+    incomplete = [{'file_id': p.id, 'offset': p.offset, 'size': p.size} for p in parts if not p.is_complete]
+    if incomplete:
+        return _json_error('Some files are incomplete.', status=409, files=incomplete)
+
+    # Claim the upload first: of two finalize requests racing here only one
+    # builds the section (a claim left behind by a crashed request expires).
+    now = timezone.now()
+    claimed = ChunkedUpload.objects.filter(
+        Q(finalizing_since__isnull=True) | Q(finalizing_since__lt=now - FINALIZE_CLAIM_TIMEOUT),
+        id=upload.id, section__isnull=True,
+    ).update(finalizing_since=now)
+    if not claimed:
+        upload.refresh_from_db()
+        if upload.section_id:
+            return _finalized(upload.section)
+        return _json_error('The upload is already being finalized.', status=409)
+
+    done = False
+    handles = []
+    try:
+        try:
+            for p in parts:
+                handles.append(File(open(p.temp_path, "rb"), name=p.name))
+        except FileNotFoundError:
+            missing = [{'file_id': p.id, 'size': p.size} for p in parts if not os.path.exists(p.temp_path)]
+            return _json_error('Some files are no longer on the server; upload them again.', status=410, files=missing)
+
+        section = Section(
+            title=upload.title,
+            lifetime_days=upload.lifetime_days,
+            keep_original_filenames=upload.keep_original_filenames,
+            scan_coordinates=upload.scan_coordinates,
+        )
+        try:
+            save_section_files(
+                section,
+                ((h.name, content) for h, (processed_name, content) in zip(handles, remove_exif_batch(handles))),
+            )
+        except MetadataError as e:
+            return _json_error(str(e), status=400)
+        ChunkedUpload.objects.filter(id=upload.id).update(section=section, finalizing_since=None)
+        done = True
+    finally:
+        for h in handles:
+            h.close()
+        if not done:
+            # Nothing was built: release the claim so the client can retry
+            ChunkedUpload.objects.filter(id=upload.id, section__isnull=True).update(finalizing_since=None)
+
+    shutil.rmtree(upload.temp_dir, ignore_errors=True)
+    return _finalized(section)
@@ -3,5 +3,3 @@ from django.apps import AppConfig
 class SecretNotesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "secret_notes"
-    def ready(self):
-        import secret_notes.signals
\ No newline at end of file
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-17 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("secret_notes", "0006_secretnote_has_password_secretnote_password_hash"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="secretnote",
+            name="expires_at",
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
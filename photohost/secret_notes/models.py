@@ -8,7 +8,7 @@ class SecretNote(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4)
     ciphertext = models.TextField()
     delete_after_read = models.BooleanField(default=False)
-    expires_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     has_password = models.BooleanField(default=False)
     password_hash = models.CharField(max_length=255, null=True, blank=True)
@@ -161,17 +161,16 @@
         form.addEventListener("submit", (e) => {
           e.preventDefault();
           const fd = new FormData(form);
-          loadRoute("sections", { q: fd.get("q"), page: 1 });
+          loadRoute("sections", { q: fd.get("q") });
         });
       }
 
       document.querySelectorAll(".dash-pager a").forEach((a) => {
         a.addEventListener("click", (e) => {
           e.preventDefault();
+          // Keyset pager: links carry q plus after / before / last
           const url = new URL(a.href);
-          const page = url.searchParams.get("page") || 1;
-          const qVal = url.searchParams.get("q") || "";
-          loadRoute("sections", { q: qVal, page });
+          loadRoute("sections", Object.fromEntries(url.searchParams.entries()));
         });
       });
 
@@ -187,17 +186,16 @@
         form.addEventListener("submit", (e) => {
           e.preventDefault();
           const fd = new FormData(form);
-          loadRoute("files", { q: fd.get("q"), page: 1 });
+          loadRoute("files", { q: fd.get("q") });
         });
       }
 
       document.querySelectorAll(".dash-pager a").forEach((a) => {
         a.addEventListener("click", (e) => {
           e.preventDefault();
+          // Keyset pager: links carry q plus after / before / last
           const url = new URL(a.href);
-          const page = url.searchParams.get("page") || 1;
-          const qVal = url.searchParams.get("q") || "";
-          loadRoute("files", { q: qVal, page });
+          loadRoute("files", Object.fromEntries(url.searchParams.entries()));
         });
       });
 
@@ -627,7 +625,7 @@
 //          e.preventDefault();
 //          const fd = new FormData(form);
 //          // reset to page 1 when searching
-//          loadRoute("sections", { q: fd.get("q"), page: 1 });
+//          loadRoute("sections", { q: fd.get("q") });
 //        });
 //      }
 //
@@ -653,7 +651,7 @@
 //          e.preventDefault();
 //          const fd = new FormData(form);
 //          // reset to page 1 when searching
-//          loadRoute("files", { q: fd.get("q"), page: 1 });
+//          loadRoute("files", { q: fd.get("q") });
 //        });
 //      }
 //
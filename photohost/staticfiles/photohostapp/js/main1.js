@@ -232,6 +232,7 @@ function updateFileListStatus(currentFileIndex, totalFiles, percent) {
 // Cancel Upload Function
 // ==============================
 cancelUploadBtn.addEventListener('click', function() {
+    cancelled = true;
     if (xhr) {
         xhr.abort();
         uploadStatusText.textContent = 'Upload cancelled';
@@ -253,9 +254,147 @@ function resetUploadForm() {
 }
 
 // ==============================
-// Form Submission with Progress (using XMLHttpRequest)
+// Chunked upload requests
 // ==============================
-uploadForm.addEventListener("submit", function (e) {
+// Files go through the resumable upload API (upload/ -> files/ -> PATCH
+// chunks -> finalize/), so a dropped connection only costs the current
+// chunk: the client asks the server for its offset and carries on.
+const CHUNK_SIZE = 4 * 1024 * 1024;  // the server accepts up to 16 MB per chunk
+const MAX_RETRIES = 5;
+
+let cancelled = false;
+
+function csrfToken() {
+    return document.querySelector('[name=csrfmiddlewaretoken]').value;
+}
+
+function wait(ms) {
+    return new Promise(resolve => setTimeout(resolve, ms));
+}
+
+// Resolves with {status, data}; rejects with "network" or "aborted"
+function sendRequest(method, url, body, headers = {}, onProgress = null) {
+    return new Promise((resolve, reject) => {
+        xhr = new XMLHttpRequest();
+        xhr.open(method, url);
+        xhr.setRequestHeader('X-CSRFToken', csrfToken());
+        xhr.setRequestHeader('X-Requested-With', 'XMLHttpRequest');
+        Object.entries(headers).forEach(([name, value]) => xhr.setRequestHeader(name, value));
+        if (onProgress) {
+            xhr.upload.addEventListener('progress', e => onProgress(e.loaded));
+        }
+        xhr.addEventListener('load', function () {
+            let data = {};
+            try {
+                data = JSON.parse(this.responseText);
+            } catch (error) {
+                // Not JSON (e.g. a proxy error page)
+            }
+            resolve({ status: this.status, data });
+        });
+        xhr.addEventListener('error', () => reject(new Error('network')));
+        xhr.addEventListener('abort', () => reject(new Error('aborted')));
+        xhr.send(body);
+    });
+}
+
+function requestError(response, fallback) {
+    return new Error(response.data.message || `${fallback} (${response.status})`);
+}
+
+async function uploadFile(file, index, url, bytesBefore) {
+    let offset = 0;
+    let retries = 0;
+
+    while (offset < file.size) {
+        if (cancelled) throw new Error('aborted');
+
+        let response = null;
+        try {
+            response = await sendRequest('PATCH', url, file.slice(offset, offset + CHUNK_SIZE), {
+                'Content-Type': 'application/octet-stream',
+                'Upload-Offset': String(offset),
+            }, loaded => {
+                updateProgress(bytesBefore + offset + loaded, totalSize);
+                updateFileListStatus(index, validFiles.length, Math.round(((offset + loaded) / file.size) * 100));
+            });
+        } catch (error) {
+            if (error.message === 'aborted') throw error;
+        }
+
+        if (response && response.status >= 200 && response.status < 300) {
+            offset = response.data.offset;
+            retries = 0;
+            continue;
+        }
+        if (response && response.status === 409 && typeof response.data.offset === 'number') {
+            // Out of sync with the server: resume where it is
+            offset = response.data.offset;
+            continue;
+        }
+        if ((response && response.status < 500) || retries >= MAX_RETRIES) {
+            throw response ? requestError(response, 'Upload failed') : new Error('network');
+        }
+
+        // Dropped connection or server error: back off, then ask how far the server got
+        retries++;
+        uploadStatusText.textContent = `Connection problem, retrying (${retries}/${MAX_RETRIES})...`;
+        await wait(1000 * retries);
+        try {
+            const status = await sendRequest('GET', url, null);
+            if (status.status === 200) offset = status.data.offset;
+        } catch (error) {
+            if (error.message === 'aborted') throw error;
+        }
+        uploadStatusText.textContent = 'Uploading files...';
+    }
+}
+
+async function finalizeUpload(url) {
+    // Finalizing is idempotent on the server, so retrying it is safe
+    for (let retries = 0; ; retries++) {
+        let response = null;
+        try {
+            response = await sendRequest('POST', url, null);
+        } catch (error) {
+            if (error.message === 'aborted') throw error;
+        }
+        if (response && response.status === 200) return response.data;
+
+        const busy = response && response.status === 409 && response.data.offset === undefined && !response.data.files;
+        const transient = !response || response.status >= 500 || busy;
+        if (!transient || retries >= MAX_RETRIES) {
+            throw response ? requestError(response, 'Upload failed') : new Error('network');
+        }
+        await wait(1000 * (retries + 1));
+    }
+}
+
+function markAllCompleted() {
+    uploadProgressBar.style.width = '100%';
+    uploadProgressBar.textContent = '100%';
+    uploadProgressBar.className = 'progress-bar progress-bar-striped bg-success';
+
+    const fileItems = uploadFileList.querySelectorAll('.upload-file-item');
+    fileItems.forEach(item => {
+        const status = item.querySelector('.file-status');
+        const progress = item.querySelector('.file-progress');
+        if (status) {
+            status.className = 'file-status completed';
+            status.innerHTML = '✓';
+        }
+        if (progress) {
+            progress.style.width = '100%';
+            progress.textContent = '100%';
+            progress.className = 'file-progress progress-bar bg-success';
+        }
+    });
+}
+
+// ==============================
+// Form Submission with Progress
+// ==============================
+uploadForm.addEventListener("submit", async function (e) {
     e.preventDefault();
 
     if (validFiles.length === 0) {
@@ -269,10 +408,12 @@ uploadForm.addEventListener("submit", function (e) {
         return;
     }
 
-    // Get form data
+    // Section settings only; the files follow in chunks
     const formData = new FormData(uploadForm);
+    formData.delete('files');
 
     // Reset progress
+    cancelled = false;
     uploadStartTime = Date.now();
     uploadedBytes = 0;
 
@@ -283,129 +424,55 @@ uploadForm.addEventListener("submit", function (e) {
     uploadStatusText.parentElement.parentElement.className = 'alert alert-info';
     uploadProgressBar.style.width = '0%';
     uploadProgressBar.textContent = '0%';
+    uploadProgressBar.className = 'progress-bar progress-bar-striped progress-bar-animated';
     uploadSpeedText.textContent = '';
     uploadProgressText.textContent = 'Starting upload...';
 
     // Create file list
     createFileList();
 
-    // Create XMLHttpRequest for progress tracking
-    xhr = new XMLHttpRequest();
-
-    // Progress event
-    xhr.upload.addEventListener('progress', function(e) {
-        if (e.lengthComputable) {
-            updateProgress(e.loaded, e.total);
-
-            // Estimate which file is being uploaded
-            const avgFileSize = totalSize / validFiles.length;
-            const currentFileIndex = Math.min(
-                Math.floor(e.loaded / avgFileSize),
-                validFiles.length - 1
-            );
-            const filePercent = Math.min(
-                Math.round(((e.loaded % avgFileSize) / avgFileSize) * 100),
-                100
-            );
-
-            updateFileListStatus(currentFileIndex, validFiles.length, filePercent);
+    try {
+        let response = await sendRequest('POST', uploadForm.dataset.chunkedUploadUrl, formData);
+        if (response.status !== 201) throw requestError(response, 'Upload failed');
+        const filesUrl = response.data.files_url;
+        const finalizeUrl = response.data.finalize_url;
+
+        uploadStatusText.textContent = 'Uploading files...';
+        for (let i = 0; i < validFiles.length; i++) {
+            const file = validFiles[i];
+            const declaration = new FormData();
+            declaration.append('name', file.name);
+            declaration.append('size', file.size);
+
+            response = await sendRequest('POST', filesUrl, declaration);
+            if (response.status !== 201) throw requestError(response, 'Upload failed');
+
+            await uploadFile(file, i, response.data.url, uploadedBytes);
+            uploadedBytes += file.size;
+            updateFileListStatus(i + 1, validFiles.length, 0);
         }
-    });
 
-    // Load event (when upload completes)
-    xhr.addEventListener('load', function() {
-        if (xhr.status >= 200 && xhr.status < 300) {
-            // Success
-            uploadStatusText.textContent = 'Upload complete! Processing files...';
-            uploadStatusText.parentElement.parentElement.className = 'alert alert-success';
-            uploadProgressBar.style.width = '100%';
-            uploadProgressBar.textContent = '100%';
-            uploadProgressBar.className = 'progress-bar progress-bar-striped bg-success';
-
-            // Mark all files as completed
-            const fileItems = uploadFileList.querySelectorAll('.upload-file-item');
-            fileItems.forEach(item => {
-                const status = item.querySelector('.file-status');
-                const progress = item.querySelector('.file-progress');
-                if (status) {
-                    status.className = 'file-status completed';
-                    status.innerHTML = '✓';
-                }
-                if (progress) {
-                    progress.style.width = '100%';
-                    progress.textContent = '100%';
-                    progress.className = 'file-progress progress-bar bg-success';
-                }
-            });
+        uploadStatusText.textContent = 'Upload complete! Processing files...';
+        const result = await finalizeUpload(finalizeUrl);
 
-            // Try to parse response as JSON for redirect
-            try {
-                const response = JSON.parse(xhr.responseText);
-                if (response.redirect_url) {
-                    setTimeout(() => {
-                        window.location.href = response.redirect_url;
-                    }, 1500);
-                } else {
-                    // If no redirect in JSON, check if response is HTML
-                    if (xhr.responseText.includes('<html')) {
-                        // It's an HTML page, reload the form
-                        setTimeout(() => {
-                            window.location.reload();
-                        }, 1500);
-                    } else {
-                        // Fallback: submit the form normally
-                        setTimeout(() => {
-                            uploadForm.submit();
-                        }, 1500);
-                    }
-                }
-            } catch (error) {
-                // If response is not JSON, it's probably HTML
-                // Submit the form normally
-                setTimeout(() => {
-                    uploadForm.submit();
-                }, 1500);
-            }
-        } else {
-            // Server error
-            uploadStatusText.textContent = `Upload failed (${xhr.status}). Please try again.`;
-            uploadStatusText.parentElement.parentElement.className = 'alert alert-danger';
-
-            // Show retry button
-            setTimeout(() => {
-                resetUploadForm();
-            }, 3000);
+        uploadStatusText.parentElement.parentElement.className = 'alert alert-success';
+        markAllCompleted();
+        setTimeout(() => {
+            window.location.href = result.redirect_url;
+        }, 1500);
+    } catch (error) {
+        if (error.message === 'aborted') {
+            return;  // the cancel button shows its own message
         }
-    });
-
-    // Error event
-    xhr.addEventListener('error', function() {
-        uploadStatusText.textContent = 'Network error. Please check your connection.';
+        uploadStatusText.textContent = error.message === 'network'
+            ? 'Network error. Please check your connection.'
+            : `${error.message} Please try again.`;
         uploadStatusText.parentElement.parentElement.className = 'alert alert-danger';
 
         setTimeout(() => {
             resetUploadForm();
         }, 3000);
-    });
-
-    // Abort event
-    xhr.addEventListener('abort', function() {
-        uploadStatusText.textContent = 'Upload cancelled';
-        uploadStatusText.parentElement.parentElement.className = 'alert alert-warning';
-
-        setTimeout(() => {
-            resetUploadForm();
-        }, 2000);
-    });
-
-    // Set CSRF token header
-    const csrfToken = document.querySelector('[name=csrfmiddlewaretoken]').value;
-    xhr.open('POST', uploadForm.action);
-    xhr.setRequestHeader('X-CSRFToken', csrfToken);
-    xhr.setRequestHeader('X-Requested-With', 'XMLHttpRequest');
-
-    // Send the request
-    xhr.send(formData);
+    }
 });
 
 // ==============================